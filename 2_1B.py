@@ -7,6 +7,18 @@ def Check_Harshad(f):
     result = f % sum
     return (result == 0)
 
+def next_digit_sum(digits, s):
+    # digits are least-significant first; update them in place for i -> i + 1
+    k = 0
+    while k < len(digits) and digits[k] == 9:
+        digits[k] = 0
+        k += 1
+    if k == len(digits):
+        digits.append(1)
+    else:
+        digits[k] += 1
+    return s + 1 - 9 * k
+
 i = int(input("From which number You want to start? => "))
 i1 = i
 f = int(input("At which number You want to end? => "))
@@ -15,11 +27,13 @@ limit = int(input("How many Consecutive harshad number You want to find? => "))
 update = int(input("How frequent you want to be updated? => "))
 max_curr = 0
 max_curr_end = 0
+digits = [int(d) for d in reversed(str(i))]
+digit_sum = sum(digits)
 print(f"Checking between {i} and {min(i + update - 1, f)} ...")
 while True:
     if(i % update == 0):
         print(f"Checking between {i} and {min(i + update - 1, f)} ...")
-    if Check_Harshad(i):
+    if digit_sum and i % digit_sum == 0:
         # print(f"Harshad Number!!!")
         curr += 1
         if curr > max_curr:
@@ -38,6 +52,7 @@ while True:
         else:
             print(f"These numbers are not exactly {limit} consecutive Harshad numbers, as {i + 1} is also a Harshad number")
     i += 1
+    digit_sum = next_digit_sum(digits, digit_sum)
     if i > f: 
         print(f"Did not find exactly {limit} consecutive Harshad numbers in range [{i1}, {f}]")
         print(f"In the give range Maximum {max_curr} consecutive Harshad numbers were found - ")
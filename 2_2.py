@@ -4,6 +4,7 @@ import sys
 import time
 from numpy.polynomial import polynomial as P_mod # For polycompanion and Polynomial class
 from numpy.polynomial import legendre as L      # For Legendre class
+from scipy.linalg import solve_triangular       # BLAS-backed triangular solves
 
 # ==================================================================
 # PART 1: HELPER FUNCTIONS (from generate_legendre.py)
@@ -41,59 +42,59 @@ def build_legendre_tridiagonal(n):
 # PART 2: HELPER FUNCTIONS (from LU_solver.py)
 # ==================================================================
 
-def lu_decomposition_fast(A):
-    """Vectorized LU decomposition with partial pivoting (A = PᵀLU)."""
-    A = A.copy()
-    n = A.shape[0]
-    L = np.eye(n)
-    P = np.eye(n)
+LU_BLOCK = 64  # columns per panel of the blocked factorization
 
-    for k in range(n - 1):
-        # Pivot selection
-        pivot = np.argmax(np.abs(A[k:, k])) + k
-        if A[pivot, k] == 0:
-            raise ValueError("Singular matrix detected.")
 
-        # Pivot swap (rows of A, P, and L up to current column)
-        if pivot != k:
-            A[[k, pivot]] = A[[pivot, k]]
-            P[[k, pivot]] = P[[pivot, k]]
-            if k > 0:
-                L[[k, pivot], :k] = L[[pivot, k], :k]
+def lu_factor(A, block=LU_BLOCK, overwrite=False):
+    """
+    Blocked, in-place LU decomposition with partial pivoting (A[perm] = LU).
+
+    L (unit diagonal, not stored) sits strictly below the diagonal and U on
+    and above it, in a single array. The row permutation is kept as an index
+    vector instead of a dense P matrix.
+
+    Each panel of `block` columns is factorised column by column; the rest
+    of the matrix is then updated with one triangular solve and one matrix
+    product, which run in BLAS.
+    """
+    LU = A if overwrite else np.array(A, dtype=float)
+    n = LU.shape[0]
+    perm = np.arange(n)
 
-        # Vectorized elimination
-        L[k+1:, k] = A[k+1:, k] / A[k, k]
-        A[k+1:, k:] -= np.outer(L[k+1:, k], A[k, k:])
+    for j0 in range(0, n, block):
+        j1 = min(j0 + block, n)
 
-    U = np.triu(A)
-    return P, L, U
+        # Panel factorisation
+        for k in range(j0, j1):
+            pivot = np.argmax(np.abs(LU[k:, k])) + k
+            if LU[pivot, k] == 0:
+                raise ValueError("Singular matrix detected.")
+            if pivot != k:
+                LU[[k, pivot]] = LU[[pivot, k]]
+                perm[[k, pivot]] = perm[[pivot, k]]
+            LU[k+1:, k] /= LU[k, k]
+            LU[k+1:, k+1:j1] -= LU[k+1:, k, None] * LU[k, None, k+1:j1]
 
+        # Trailing update: U12 = L11^-1 A12, A22 -= L21 U12
+        if j1 < n:
+            LU[j0:j1, j1:] = solve_triangular(LU[j0:j1, j0:j1], LU[j0:j1, j1:], lower=True,
+                                              unit_diagonal=True, check_finite=False)
+            LU[j1:, j1:] -= LU[j1:, j0:j1] @ LU[j0:j1, j1:]
 
-def forward_substitution_fast(L, b):
-    """Vectorized forward substitution (Ly=b)."""
-    n = L.shape[0]
-    y = np.zeros(n, dtype=float)
-    for i in range(n):
-        y[i] = b[i] - np.dot(L[i, :i], y[:i])
-    return y
+    return LU, perm
 
 
-def backward_substitution_fast(U, y):
-    """Vectorized backward substitution (Ux=y)."""
-    n = U.shape[0]
-    x = np.zeros(n, dtype=float)
-    for i in range(n - 1, -1, -1):
-        x[i] = (y[i] - np.dot(U[i, i+1:], x[i+1:])) / U[i, i]
-    return x
+def lu_solve(factors, B):
+    """Solve A X = B with a factorization from lu_factor (B: vector or n x k matrix)."""
+    LU, perm = factors
+    Y = solve_triangular(LU, np.asarray(B, dtype=float)[perm], lower=True,
+                         unit_diagonal=True, check_finite=False)
+    return solve_triangular(LU, Y, lower=False, check_finite=False)
 
 
 def solve_lu_fast(A, b):
-    """Full LU solve using vectorized steps."""
-    P, L, U = lu_decomposition_fast(A)
-    Pb = P @ b
-    y = forward_substitution_fast(L, Pb)
-    x = backward_substitution_fast(U, y)
-    return x
+    """Full LU solve: factor once, then two triangular solves."""
+    return lu_solve(lu_factor(A), b)
 
 # ==================================================================
 # PART 3: HELPER FUNCTION (from newton_raphson.py)
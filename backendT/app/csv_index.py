@@ -0,0 +1,170 @@
+# app/csv_index.py
+import csv
+import io
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ===============================================================
+# Windowed CSV reads
+# ===============================================================
+# /fullcsv and /preview serve rows [offset, offset + limit) of a CSV
+# without reading the whole file. Each file gets a sparse line-offset
+# index, built once with a single pass over the file: the byte offset of
+# every CSV_INDEX_STRIDE-th line. It is cached per (path, size, mtime),
+# so a file rewritten in place is re-indexed. A window read seeks to the
+# nearest indexed line and skips at most CSV_INDEX_STRIDE - 1 lines, so
+# memory stays flat for a 10^6-row table.
+
+CSV_INDEX_STRIDE = int(os.environ.get("CSV_INDEX_STRIDE", "256"))
+CSV_INDEX_CACHE_FILES = int(os.environ.get("CSV_INDEX_CACHE_FILES", "64"))
+CSV_PAGE_MAX_ROWS = int(os.environ.get("CSV_PAGE_MAX_ROWS", "10000"))
+SCAN_BLOCK_BYTES = 1 << 20
+
+
+class LineIndex:
+    """Byte offsets of every stride-th line of a file and its line count."""
+
+    def __init__(self, path, stride=CSV_INDEX_STRIDE):
+        self.path = path
+        self.stride = max(1, int(stride))
+        offsets = [0]
+        lines = 0  # newlines seen so far
+        size = 0
+        last = b""
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(SCAN_BLOCK_BYTES)
+                if not block:
+                    break
+                ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+                # Line k starts right after newline k - 1; keep k = stride, 2*stride, ...
+                first = (-lines - 1) % self.stride
+                offsets.extend((size + ends[first::self.stride] + 1).tolist())
+                lines += len(ends)
+                size += len(block)
+                last = block[-1:]
+        self.size = size
+        self.rows = lines + (1 if last not in (b"", b"\n") else 0)
+        # A start equal to the file size is the empty "line" after a final newline
+        self.offsets = np.array([o for o in offsets if o < size] or [0], dtype=np.int64)
+
+    def read_lines(self, offset, limit):
+        """Raw text of lines [offset, offset + limit) (fewer at the end of the file)."""
+        offset = max(0, int(offset))
+        limit = max(0, min(int(limit), self.rows - offset))
+        if limit == 0:
+            return []
+        block, skip = divmod(offset, self.stride)
+        out = []
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[block]))
+            for _ in range(skip):
+                f.readline()
+            for _ in range(limit):
+                line = f.readline()
+                if not line:
+                    break
+                out.append(line.decode("utf-8", "replace"))
+        if offset == 0 and out:
+            out[0] = out[0].lstrip("\ufeff")
+        return out
+
+
+def parse_columns(spec):
+    """Column selection such as "0,2,5-7" -> [0, 2, 5, 6, 7]; None/"" selects all."""
+    if spec is None or not str(spec).strip():
+        return None
+    columns = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            lo, hi = int(lo), int(hi)
+            if lo < 0 or hi < lo:
+                raise ValueError(f"Invalid column range '{part}'")
+            columns.extend(range(lo, hi + 1))
+        else:
+            if int(part) < 0:
+                raise ValueError(f"Invalid column '{part}'")
+            columns.append(int(part))
+    return columns
+
+
+def select_rows(lines, columns=None):
+    """Parse CSV lines into rows, keeping only the given column indices."""
+    rows = list(csv.reader(lines))
+    if columns is None:
+        return rows
+    return [[row[c] if c < len(row) else "" for c in columns] for row in rows]
+
+
+def rows_to_text(rows):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+class CsvIndexCache:
+    """Thread-safe LRU of LineIndex objects keyed by (path, size, mtime)."""
+
+    def __init__(self, maxsize=CSV_INDEX_CACHE_FILES, stride=CSV_INDEX_STRIDE):
+        self.maxsize = max(1, int(maxsize))
+        self.stride = stride
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path):
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        index = LineIndex(path, self.stride)  # built outside the lock
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] == path]:
+                del self._entries[stale]
+            self._entries[key] = index
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return index
+
+    def window(self, path, offset=0, limit=CSV_PAGE_MAX_ROWS, columns=None):
+        """Rows [offset, offset + limit) of a CSV, plus its total row count."""
+        index = self.get(path)
+        lines = index.read_lines(offset, min(limit, CSV_PAGE_MAX_ROWS))
+        return select_rows(lines, columns), index.rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "stride": self.stride,
+                "indexed_rows": sum(i.rows for i in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+csv_index_cache = CsvIndexCache()
@@ -0,0 +1,207 @@
+# app/events.py
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+from app.solutions.events import is_marker
+from app.workspace import OUTPUT_DIR
+
+# ===============================================================
+# Structured run events (Server-Sent Events)
+# ===============================================================
+# A run started with Accept: text/event-stream (or ?format=sse) is driven
+# by a background task instead of the HTTP response, so it survives a
+# dropped connection. Its events go to a bounded per-run log with
+# increasing IDs; a client reconnecting with Last-Event-ID to
+# GET /events/{run_id} gets everything after that ID and then follows the
+# run live.
+#
+# Event types: start, log (a batch of text lines), progress, artifact
+# (run-scoped file ID usable with /download, /preview, /array), metrics,
+# and finally done or error.
+
+EVENT_LOG_SIZE = int(os.environ.get("EVENT_LOG_SIZE", "10000"))  # events kept per run
+EVENT_RETENTION_SECONDS = float(os.environ.get("EVENT_RETENTION_SECONDS", "600"))  # finished runs stay resumable
+EVENT_ORPHAN_SECONDS = float(os.environ.get("EVENT_ORPHAN_SECONDS", "60"))  # cancel runs nobody follows
+SSE_KEEPALIVE_SECONDS = 15.0
+
+END_MARKER = "---END---"
+ERROR_PREFIXES = ("Error", "⏱️ Job stopped")
+
+
+def is_error_line(text) -> bool:
+    return text.strip().startswith(ERROR_PREFIXES)
+
+
+def file_id(path):
+    """Run-scoped file ID (path relative to output/) of an artifact, or None outside output/."""
+    rel = os.path.relpath(os.path.abspath(path), OUTPUT_DIR).replace("\\", "/")
+    return None if rel.startswith("..") else rel
+
+
+def format_sse(event_id, event, data) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class RunEvents:
+    """Event log of one run, appended by its driver task and followed by any number of clients."""
+
+    def __init__(self, run_id, endpoint, max_events=EVENT_LOG_SIZE):
+        self.run_id = run_id
+        self.endpoint = endpoint
+        self.log = deque(maxlen=max(1, int(max_events)))
+        self.next_id = 1
+        self.started = time.monotonic()
+        self.finished_at = None
+        self.followers = 0
+        self.last_seen = self.started
+        self.abandoned = False
+        self.lines = 0
+        self.fraction = 0.0
+        self.artifacts = []
+        self.error = None
+        self.task = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def add(self, event, data):
+        self.log.append((self.next_id, event, data))
+        self.next_id += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, batch):
+        """
+        Turn one batch of solver output (text lines and markers) into
+        events. Lines are merged into log events and only the latest
+        progress marker of the batch is kept.
+        """
+        lines = []
+        latest_progress = None
+        for item in batch:
+            if is_marker(item):
+                if item["event"] == "progress":
+                    latest_progress = item
+                    continue
+                if lines:
+                    self.add("log", {"lines": lines})
+                    lines = []
+                self._publish_marker(dict(item))
+                continue
+            text = item.decode("utf-8", "replace") if isinstance(item, bytes) else str(item)
+            text = text.rstrip("\n")
+            if text.strip() == END_MARKER:
+                continue
+            if self.error is None and is_error_line(text):
+                self.error = text.strip()
+            lines.append(text)
+            self.lines += 1
+        if lines:
+            self.add("log", {"lines": lines})
+        if latest_progress is not None:
+            self._publish_marker(dict(latest_progress))
+
+    def _publish_marker(self, marker):
+        event = marker.pop("event")
+        if event == "progress":
+            self.fraction = marker["fraction"]
+        elif event == "artifact":
+            fid = file_id(marker.pop("path"))
+            if fid is None:
+                return
+            self.artifacts.append(fid)
+            marker.update(file=fid, name=os.path.basename(fid), kind=os.path.splitext(fid)[1].lstrip("."))
+        self.add(event, marker)
+
+    def finish(self, error=None):
+        """Append the closing metrics and done/error events."""
+        if self.finished:
+            return
+        if error is None and self.abandoned:
+            error = f"Run cancelled: no client followed it for {EVENT_ORPHAN_SECONDS:g}s"
+        error = error or self.error
+        self.add("metrics", {
+            "seconds": round(time.monotonic() - self.started, 6),
+            "lines": self.lines,
+            "artifacts": len(self.artifacts),
+        })
+        if error:
+            self.add("error", {"run_id": self.run_id, "message": error})
+        else:
+            self.add("progress", {"fraction": 1.0})
+            self.add("done", {"run_id": self.run_id, "artifacts": self.artifacts})
+        self.finished_at = time.monotonic()
+
+    async def is_abandoned(self):
+        """Polled by the solver pool: True once no client has followed the run for a while."""
+        if self.followers == 0 and time.monotonic() - self.last_seen > EVENT_ORPHAN_SECONDS:
+            self.abandoned = True
+        return self.abandoned
+
+    async def follow(self, after=0):
+        """
+        Yield lists of (id, event, data) with id > after until the run is
+        finished, or None when nothing happened for SSE_KEEPALIVE_SECONDS.
+        Events older than the retained log are skipped.
+        """
+        self.followers += 1
+        try:
+            while True:
+                if self.log:
+                    start = max(0, after + 1 - self.log[0][0])
+                    pending = list(itertools.islice(self.log, start, None))
+                    if pending:
+                        after = pending[-1][0]
+                        yield pending
+                        continue
+                if self.finished:
+                    return
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.followers -= 1
+            self.last_seen = time.monotonic()
+
+
+class EventRegistry:
+    """Runs with an event log, kept resumable for EVENT_RETENTION_SECONDS after they finish."""
+
+    def __init__(self, retention=EVENT_RETENTION_SECONDS):
+        self.retention = retention
+        self.runs = {}
+        self.resumes = 0
+
+    def create(self, run_id, endpoint):
+        self.prune()
+        run = self.runs[run_id] = RunEvents(run_id, endpoint)
+        return run
+
+    def get(self, run_id):
+        self.prune()
+        return self.runs.get(run_id)
+
+    def prune(self):
+        now = time.monotonic()
+        for run_id, run in list(self.runs.items()):
+            if run.finished and now - run.finished_at > self.retention:
+                del self.runs[run_id]
+
+    def stats(self):
+        return {
+            "runs": len(self.runs),
+            "active": sum(not r.finished for r in self.runs.values()),
+            "followers": sum(r.followers for r in self.runs.values()),
+            "resumes": self.resumes,
+        }
+
+
+event_registry = EventRegistry()
@@ -0,0 +1,396 @@
+# app/executor.py
+import asyncio
+import importlib
+import json
+import math
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # POSIX only: hard CPU-time limits for worker processes
+except ImportError:
+    resource = None
+
+# ===============================================================
+# Solver execution pool
+# ===============================================================
+# Solver generators are CPU-bound and synchronous. Running them inline in
+# the StreamingResponse would block the event loop (and every other
+# client), so they are driven from a bounded worker pool and their lines
+# are bridged back through an asyncio.Queue.
+#
+# With the "process" backend each run executes in its own worker process,
+# so a client disconnect or an exceeded time limit terminates the job
+# instead of leaving it burning a core. The "thread" backend runs the
+# generator in the bridging thread and enforces limits cooperatively.
+
+MAX_CONCURRENT_SOLVES = int(os.environ.get("MAX_CONCURRENT_SOLVES", str(os.cpu_count() or 4)))
+MAX_QUEUED_SOLVES = int(os.environ.get("MAX_QUEUED_SOLVES", "64"))
+STREAM_QUEUE_SIZE = 256  # lines buffered per run before the worker waits
+SOLVER_BACKEND = os.environ.get("SOLVER_BACKEND", "process")  # "process" or "thread"
+DISCONNECT_POLL_SECONDS = 1.0
+# Streamed lines are coalesced into chunks of up to STREAM_CHUNK_BYTES,
+# flushed at the latest STREAM_CHUNK_MS after their first line arrived
+STREAM_CHUNK_BYTES = int(os.environ.get("STREAM_CHUNK_BYTES", str(16 * 1024)))
+STREAM_CHUNK_SECONDS = float(os.environ.get("STREAM_CHUNK_MS", "20")) / 1000.0
+
+# Per-endpoint limits; override with e.g.
+#   SOLVER_JOB_LIMITS='{"2_1B": {"cpu_seconds": 600, "wall_seconds": 900}}'
+DEFAULT_JOB_LIMITS = {
+    "2_1A": {"cpu_seconds": 120, "wall_seconds": 300},
+    "2_1B": {"cpu_seconds": 300, "wall_seconds": 600},
+    "2_2": {"cpu_seconds": 120, "wall_seconds": 300},
+    "3_1": {"cpu_seconds": 60, "wall_seconds": 120},
+    "3_2": {"cpu_seconds": 120, "wall_seconds": 300},
+}
+
+SOLUTION_MODULES = [
+    "app.solutions.s2_1a",
+    "app.solutions.s2_1b",
+    "app.solutions.s2_2",
+    "app.solutions.s3_1",
+    "app.solutions.s3_2",
+]
+
+# Per-process caches used by the solvers. A process-backend run executes
+# in a fresh worker, so its lookups never reach the API process's copy;
+# each worker reports these counters when its run ends and /metrics
+# shows their totals. name -> (module, attribute)
+WORKER_CACHES = {
+    "gauss_legendre_cache": ("app.solutions.gauss_legendre", "gl_cache"),
+}
+WORKER_COUNTERS = ("hits", "disk_hits", "misses", "evictions")
+
+
+def load_job_limits():
+    limits = {k: dict(v) for k, v in DEFAULT_JOB_LIMITS.items()}
+    overrides = os.environ.get("SOLVER_JOB_LIMITS")
+    if overrides:
+        for endpoint, values in json.loads(overrides).items():
+            limits.setdefault(endpoint, {}).update(values)
+    return limits
+
+
+JOB_LIMITS = load_job_limits()
+
+
+def job_limits(endpoint: str):
+    """CPU/wall-time limits (seconds) configured for an endpoint."""
+    return JOB_LIMITS.get(endpoint, {})
+
+
+def _start_method():
+    method = os.environ.get("SOLVER_START_METHOD")
+    if method:
+        return method
+    return "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+_mp_context = mp.get_context(_start_method())
+if _mp_context.get_start_method() == "forkserver":
+    # Workers fork from a server that already has numpy & the solvers imported
+    _mp_context.set_forkserver_preload(SOLUTION_MODULES)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _limit_lines(kind: str, seconds):
+    yield f"\n⏱️ Job stopped: exceeded the {seconds:g}s {kind} limit for this endpoint.\n"
+    yield "---END---\n"
+
+
+# ===============================================================
+# Backends: each turns (generator_func, args, kwargs) into an iterator
+# ===============================================================
+
+def _iter_inline(generator_func, args, kwargs, limits, cancelled):
+    """Thread backend: run the generator here, checking limits between lines."""
+    cpu_limit = limits.get("cpu_seconds")
+    wall_limit = limits.get("wall_seconds")
+    start_wall = time.monotonic()
+    start_cpu = time.thread_time()
+    gen = generator_func(*args, **kwargs)
+    try:
+        for item in gen:
+            yield item
+            if wall_limit and time.monotonic() - start_wall > wall_limit:
+                yield from _limit_lines("wall-time", wall_limit)
+                return
+            if cpu_limit and time.thread_time() - start_cpu > cpu_limit:
+                yield from _limit_lines("CPU-time", cpu_limit)
+                return
+    finally:
+        gen.close()
+
+
+def _process_main(conn, generator_func, args, kwargs, cpu_seconds):
+    """Entry point of a solver worker process."""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # own process group, so helpers it spawns die with it
+    if resource is not None and cpu_seconds:
+        limit = int(math.ceil(cpu_seconds))
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 1))
+        except (ValueError, OSError):
+            pass
+    try:
+        try:
+            for item in generator_func(*args, **kwargs):
+                conn.send(("item", item))
+        finally:
+            conn.send(("counters", _cache_counters()))
+        conn.send(("done", None))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _cache_counters():
+    """This worker's WORKER_CACHES counters (all of them come from the current run)."""
+    counters = {}
+    for name, (module, attr) in WORKER_CACHES.items():
+        stats = getattr(importlib.import_module(module), attr).stats()
+        counters[name] = {k: stats[k] for k in WORKER_COUNTERS if k in stats}
+    return counters
+
+
+_worker_totals = {}
+_worker_lock = threading.Lock()
+
+
+def _add_worker_counters(counters):
+    with _worker_lock:
+        for name, values in counters.items():
+            totals = _worker_totals.setdefault(name, {"runs": 0})
+            totals["runs"] += 1
+            for k, v in values.items():
+                totals[k] = totals.get(k, 0) + v
+
+
+def worker_cache_stats(name):
+    """Summed counters of one WORKER_CACHES entry over every finished worker run."""
+    with _worker_lock:
+        totals = dict(_worker_totals.get(name, {"runs": 0}))
+    lookups = sum(totals.get(k, 0) for k in ("hits", "disk_hits", "misses"))
+    hits = totals.get("hits", 0) + totals.get("disk_hits", 0)
+    totals["hit_ratio"] = (hits / lookups) if lookups else 0.0
+    return totals
+
+
+_live_processes = set()
+_live_lock = threading.Lock()
+
+
+def _terminate(proc):
+    if proc.is_alive():
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(proc.pid, signal.SIGTERM)
+            else:
+                proc.terminate()
+        except (ProcessLookupError, PermissionError):
+            proc.terminate()
+        proc.join(1)
+        if proc.is_alive():
+            proc.kill()
+    proc.join()
+
+
+def _iter_process(generator_func, args, kwargs, limits, cancelled):
+    """Process backend: run the generator in a dedicated worker process."""
+    cpu_limit = limits.get("cpu_seconds")
+    wall_limit = limits.get("wall_seconds")
+    reader, writer = _mp_context.Pipe(duplex=False)
+    proc = _mp_context.Process(target=_process_main, args=(writer, generator_func, args, kwargs, cpu_limit))
+    proc.start()
+    writer.close()
+    with _live_lock:
+        _live_processes.add(proc)
+    deadline = time.monotonic() + wall_limit if wall_limit else None
+    try:
+        while not cancelled.is_set():
+            if deadline is not None and time.monotonic() > deadline:
+                yield from _limit_lines("wall-time", wall_limit)
+                return
+            if not reader.poll(0.25):
+                continue
+            try:
+                kind, payload = reader.recv()
+            except EOFError:
+                proc.join(1)
+                if hasattr(signal, "SIGXCPU") and proc.exitcode in (-signal.SIGXCPU, -signal.SIGKILL) and cpu_limit:
+                    yield from _limit_lines("CPU-time", cpu_limit)
+                else:
+                    yield f"Error: solver process exited unexpectedly (code {proc.exitcode})\n"
+                    yield "---END---\n"
+                return
+            if kind == "item":
+                yield payload
+            elif kind == "counters":
+                _add_worker_counters(payload)
+            elif kind == "done":
+                return
+            else:
+                raise RuntimeError(payload)
+    finally:
+        reader.close()
+        _terminate(proc)
+        with _live_lock:
+            _live_processes.discard(proc)
+
+
+# ===============================================================
+# Pool
+# ===============================================================
+
+class SolverPool:
+    """Bounded worker pool that streams solver generator output asynchronously."""
+
+    def __init__(self, max_workers=MAX_CONCURRENT_SOLVES, max_queued=MAX_QUEUED_SOLVES, backend=SOLVER_BACKEND):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queued = max(0, int(max_queued))
+        self.backend = backend
+        self._iterate = _iter_process if backend == "process" else _iter_inline
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="solver")
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.cancelled = 0
+
+    def is_saturated(self) -> bool:
+        """True when every worker is busy and the wait queue is full."""
+        with self._lock:
+            return self.running >= self.max_workers and self.queued >= self.max_queued
+
+    def queue_position(self) -> int:
+        """Number of runs that would be ahead of a new submission."""
+        with self._lock:
+            return max(0, self.running + self.queued - self.max_workers + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "running": self.running,
+                "queued": self.queued,
+                "cancelled": self.cancelled,
+            }
+
+    async def stream(self, generator_func, args=(), kwargs=None, limits=None, is_disconnected=None,
+                     batch_bytes=0, batch_seconds=0.0):
+        """
+        Run generator_func(*args, **kwargs) on the pool and yield its items.
+        is_disconnected is an optional coroutine function polled while the
+        solver is silent; when it reports True the job is cancelled.
+        With batch_bytes > 0 items are yielded as lists instead, each closed
+        once its text reaches batch_bytes or its first item is batch_seconds
+        old, so a chatty solver doesn't cost one write per line.
+        """
+        kwargs = kwargs or {}
+        limits = limits or {}
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()  # bounded by slots, so handing over an item never waits for the loop
+        slots = threading.Semaphore(STREAM_QUEUE_SIZE)
+        cancelled = threading.Event()
+
+        def put(item) -> bool:
+            # Block the worker (not the loop) while the consumer catches up
+            while not cancelled.is_set():
+                if slots.acquire(timeout=0.5):
+                    try:
+                        loop.call_soon_threadsafe(queue.put_nowait, item)
+                    except RuntimeError:  # event loop already closed
+                        return False
+                    return True
+            return False
+
+        def run():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            items = None
+            try:
+                items = self._iterate(generator_func, args, kwargs, limits, cancelled)
+                for item in items:
+                    if not put(item):
+                        break
+                put(_DONE)
+            except Exception as e:
+                put(_Failure(e))
+            finally:
+                if items is not None:
+                    items.close()
+                with self._lock:
+                    self.running -= 1
+
+        with self._lock:
+            self.queued += 1
+        future = self._executor.submit(run)
+        finished = False
+        batch, batch_size, deadline = [], 0, None
+        try:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = DISCONNECT_POLL_SECONDS
+                    if batch:
+                        timeout = max(0.0, deadline - loop.time())
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        if batch:
+                            yield batch
+                            batch, batch_size = [], 0
+                            continue
+                        if is_disconnected is not None and await is_disconnected():
+                            break
+                        continue
+                slots.release()
+                if item is _DONE or isinstance(item, _Failure):
+                    finished = True
+                    if batch:
+                        yield batch
+                    if item is _DONE:
+                        break
+                    raise item.exc
+                if batch_bytes <= 0:
+                    yield item
+                    continue
+                if not batch:
+                    deadline = loop.time() + batch_seconds
+                batch.append(item)
+                batch_size += len(item) if isinstance(item, (str, bytes)) else 0
+                if batch_size >= batch_bytes or loop.time() >= deadline:
+                    yield batch
+                    batch, batch_size = [], 0
+        finally:
+            if not finished:
+                with self._lock:
+                    self.cancelled += 1
+            cancelled.set()
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with _live_lock:
+            procs = list(_live_processes)
+        for proc in procs:
+            _terminate(proc)
+
+
+solver_pool = SolverPool()
@@ -1,20 +1,53 @@
 # app/main.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from contextlib import asynccontextmanager
 from app.schemas import SolveRequest
 import os
 import asyncio
+from app import workspace
+from app.executor import solver_pool, job_limits, worker_cache_stats, STREAM_CHUNK_BYTES, STREAM_CHUNK_SECONDS
+from app.events import event_registry, format_sse
+from app.run_cache import run_cache, RunRecorder
+from app.single_flight import flights
+from app.csv_index import csv_index_cache, parse_columns, select_rows, rows_to_text, CSV_PAGE_MAX_ROWS
+from app.solutions.events import is_marker
+from app.workspace import OUTPUT_DIR
 from app.solutions import s3_2_plot_api
+from app.solutions.gauss_legendre import gl_cache, GL_PREWARM
 from urllib.parse import unquote
+import numpy as np
+
+# ===============================================================
+# Background janitor for per-run output workspaces
+# ===============================================================
+async def run_janitor():
+    """Periodically evict old run workspaces by age and disk budget."""
+    while True:
+        try:
+            await asyncio.to_thread(workspace.evict_runs)
+        except Exception as e:
+            print(f"⚠️ Run janitor failed: {e}")
+        await asyncio.sleep(workspace.JANITOR_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    janitor = asyncio.create_task(run_janitor())
+    if GL_PREWARM:
+        await asyncio.to_thread(gl_cache.prewarm, GL_PREWARM)
+    yield
+    janitor.cancel()
+    solver_pool.shutdown()
 
 # ===============================================================
 # Initialize FastAPI
 # ===============================================================
 app = FastAPI(
     title="Numerical Methods Assignment Backend",
-    version="2.0"
+    version="2.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend
@@ -26,28 +59,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Directory for generated output files
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # project root (one level above app/)
-OUTPUT_DIR = os.path.join(BASE_DIR, "output")  # project_root/output
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-def get_question_dir(question_id: str) -> str:
-    """Return (and ensure) a subfolder for a given question inside output/."""
-    folder = os.path.join(OUTPUT_DIR, question_id)
-    os.makedirs(folder, exist_ok=True)
-    return folder
-
-def clear_question_dir(question_id: str):
-    """Delete all existing files in a specific question's folder."""
-    folder = get_question_dir(question_id)
-    for filename in os.listdir(folder):
-        file_path = os.path.join(folder, filename)
-        try:
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            print(f"⚠️ Could not delete {file_path}: {e}")
-
 # ===============================================================
 # Include additional routers (for τ slider API)
 # ===============================================================
@@ -72,143 +83,385 @@ async def root():
             "/files",
             "/files/{filename}",
             "/preview/{filename}",
+            "/array/{filename}",
+        ],
+        "event_endpoints": [
+            "/stream/{question_id}?format=sse  (or Accept: text/event-stream)",
+            "/events/{run_id}  (resume with Last-Event-ID)",
         ],
         "extra_routes": [
-            "/compute_temp  (for live τ-slider plotting)"
+            "/compute_temp  (for live τ-slider plotting)",
+            "/metrics"
         ]
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the solver pool and caches."""
+    return {
+        "solver_pool": solver_pool.stats(),
+        # /compute_temp runs in this process, so these counters are complete
+        "collocation_cache": {"scope": "api process", **s3_2_plot_api.collocation_cache.stats()},
+        # Lookups made here (thread backend, /compute_temp) plus the totals
+        # reported back by process-backend solver workers
+        "gauss_legendre_cache": {
+            "scope": "api process",
+            **gl_cache.stats(),
+            "solver_workers": worker_cache_stats("gauss_legendre_cache"),
+        },
+        "event_streams": event_registry.stats(),
+        "run_cache": run_cache.stats(),
+        "single_flight": flights.stats(),
+        "csv_index_cache": csv_index_cache.stats(),
+    }
+
 # ===============================================================
 # Helper: Unified Stream Wrapper
 # ===============================================================
-def make_stream_response(generator_func, params):
-    """Stream generator output line by line to frontend in real time."""
+def encode_line(line) -> bytes:
+    if isinstance(line, bytes):
+        return line
+    if is_marker(line):
+        return b""  # structured markers only go to event streams
+    return (line if line.endswith("\n") else (line + "\n")).encode("utf-8")
+
+def wants_cache(request) -> bool:
+    """False for ?cache=0: compute privately, without the run cache or a shared run."""
+    return request is None or request.query_params.get("cache") != "0"
+
+async def solve_batches(generator_func, params, endpoint, kwargs, run_dir, is_disconnected, use_cache=True):
+    """
+    Batches of solver output for one run: replayed from the run cache
+    (with the cached artifacts linked into run_dir) on a hit, otherwise
+    shared with identical in-flight runs, or computed on the solver pool
+    and stored if the run succeeds.
+    """
+    key = run_cache.key(endpoint, generator_func, params) if use_cache else None
+    cached = await asyncio.to_thread(run_cache.get, key) if key and run_cache.enabled else None
+    if cached is not None:
+        meta, transcript = cached
+        try:
+            await asyncio.to_thread(run_cache.restore_files, key, meta, run_dir)
+        except OSError:
+            cached = None  # evicted meanwhile: compute instead
+    if cached is not None:
+        for batch in run_cache.replay(meta, transcript, run_dir):
+            yield batch
+        return
+    if key and flights.enabled:
+        async for batch in flights.stream(key, generator_func, params, endpoint, run_dir, is_disconnected):
+            yield batch
+        return
+
+    ahead = solver_pool.queue_position()
+    if ahead > 0:
+        yield [f"Waiting for a free solver slot ({ahead} run(s) ahead)...\n"]
+    recorder = RunRecorder(run_dir)
+    batches = solver_pool.stream(
+        generator_func, (params,), kwargs,
+        limits=job_limits(endpoint),
+        is_disconnected=is_disconnected,
+        batch_bytes=STREAM_CHUNK_BYTES,
+        batch_seconds=STREAM_CHUNK_SECONDS,
+    )
+    try:
+        async for batch in batches:
+            if key:
+                recorder.record(batch)
+            yield batch
+    finally:
+        await batches.aclose()
+    if key and run_cache.enabled and recorder.cacheable:
+        await asyncio.to_thread(run_cache.put, key, endpoint, params, recorder)
+
+def make_stream_response(generator_func, params, endpoint, isolated_output=False, request=None):
+    """
+    Stream generator output to frontend in real time.
+    The generator runs on the bounded solver pool (with the endpoint's
+    CPU/wall-time limits) so the event loop stays free, and is cancelled
+    when the client disconnects. Lines are sent in chunks of up to
+    STREAM_CHUNK_BYTES, each at most STREAM_CHUNK_SECONDS behind its first
+    line. With isolated_output the run gets its own output workspace and
+    the first streamed line announces its run ID. Repeated requests are
+    answered from the run cache unless ?cache=0 is given.
+    """
+    if solver_pool.is_saturated():
+        raise HTTPException(status_code=503, detail="Server busy: too many queued solver runs, try again shortly")
+    if wants_events(request):
+        return start_event_run(generator_func, params, endpoint, isolated_output, wants_cache(request))
+
     async def event_stream():
-        for line in generator_func(params):
-            if isinstance(line, bytes):
-                chunk = line
-            else:
-                text = line if line.endswith("\n") else (line + "\n")
-                chunk = text.encode("utf-8")
-            yield chunk
-            await asyncio.sleep(0)  # yield control to event loop
+        kwargs = {}
+        run_dir = None
+        if isolated_output:
+            run_id, run_dir = workspace.create_run(endpoint)
+            kwargs["output_dir"] = run_dir
+            yield f"Run ID: {run_id}\n".encode("utf-8")
+        try:
+            batches = solve_batches(
+                generator_func, params, endpoint, kwargs, run_dir,
+                is_disconnected=request.is_disconnected if request is not None else None,
+                use_cache=wants_cache(request),
+            )
+            async for batch in batches:
+                yield b"".join(encode_line(line) for line in batch)
+        finally:
+            if run_dir is not None:
+                workspace.release_run(run_dir)
     return StreamingResponse(event_stream(), media_type="text/plain; charset=utf-8")
 
+# ===============================================================
+# Helper: Structured event streams (SSE)
+# ===============================================================
+def wants_events(request) -> bool:
+    if request is None:
+        return False
+    return (request.query_params.get("format") == "sse"
+            or "text/event-stream" in request.headers.get("accept", ""))
+
+def last_event_id(request) -> int:
+    value = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+async def drive_event_run(run, generator_func, params, endpoint, kwargs, run_dir, use_cache):
+    """Background task: run the solver and append its output to the run's event log."""
+    try:
+        batches = solve_batches(generator_func, params, endpoint, kwargs, run_dir,
+                                is_disconnected=run.is_abandoned, use_cache=use_cache)
+        async for batch in batches:
+            run.publish(batch)
+            if await run.is_abandoned():
+                break
+        await batches.aclose()
+        run.finish()
+    except Exception as e:
+        run.finish(f"{type(e).__name__}: {e}")
+    finally:
+        run.finish("Run interrupted")
+        if run_dir is not None:
+            workspace.release_run(run_dir)
+
+def event_stream_response(run, after=0):
+    """SSE response replaying the run's events after ID `after`, then following it live."""
+    async def stream():
+        yield b"retry: 2000\n\n"
+        async for events in run.follow(after):
+            if events is None:
+                yield b": keepalive\n\n"
+            else:
+                yield b"".join(format_sse(*event) for event in events)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Run-ID": run.run_id}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+def start_event_run(generator_func, params, endpoint, isolated_output, use_cache=True):
+    """Start a run in the background and answer with its event stream."""
+    kwargs = {}
+    run_dir = None
+    if isolated_output:
+        run_id, run_dir = workspace.create_run(endpoint)
+        kwargs["output_dir"] = run_dir
+    else:
+        run_id = workspace.new_run_id()
+    run = event_registry.create(run_id, endpoint)
+    run.add("start", {"run_id": run_id, "endpoint": endpoint, "queue_position": solver_pool.queue_position()})
+    run.task = asyncio.create_task(drive_event_run(run, generator_func, params, endpoint, kwargs, run_dir, use_cache))
+    return event_stream_response(run)
+
+@app.get("/events/{run_id}")
+async def resume_events(run_id: str, request: Request):
+    """Follow or resume the event stream of a run started with format=sse."""
+    run = event_registry.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"No event stream for run {run_id}")
+    event_registry.resumes += 1
+    return event_stream_response(run, last_event_id(request))
+
 # ===============================================================
 # STREAMING ASSIGNMENT ENDPOINTS
 # ===============================================================
 @app.post("/stream/2_1A")
-async def stream_2_1a(req: SolveRequest):
+async def stream_2_1a(req: SolveRequest, request: Request):
     from app.solutions import s2_1a
-    return make_stream_response(s2_1a.stream_s2_1a, req.params)
+    return make_stream_response(s2_1a.stream_s2_1a, req.params, "2_1A", request=request)
 
 @app.post("/stream/2_1B")
-async def stream_2_1b(req: SolveRequest):
+async def stream_2_1b(req: SolveRequest, request: Request):
     from app.solutions import s2_1b
-    return make_stream_response(s2_1b.stream_s2_1b, req.params)
+    return make_stream_response(s2_1b.stream_s2_1b, req.params, "2_1B", request=request)
 
 @app.post("/stream/2_2")
-async def stream_2_2(req: SolveRequest):
+async def stream_2_2(req: SolveRequest, request: Request):
     from app.solutions import s2_2
-    question_id = "2_2"
-    clear_question_dir(question_id)
-    return make_stream_response(s2_2.stream_s2_2, req.params)
+    return make_stream_response(s2_2.stream_s2_2, req.params, "2_2", isolated_output=True, request=request)
 
 @app.post("/stream/3_1")
-async def stream_3_1(req: SolveRequest):
+async def stream_3_1(req: SolveRequest, request: Request):
     from app.solutions import s3_1
-    question_id = "3_1"
-    clear_question_dir(question_id)
-    return make_stream_response(s3_1.stream_s3_1, req.params)
+    return make_stream_response(s3_1.stream_s3_1, req.params, "3_1", isolated_output=True, request=request)
 
 @app.post("/stream/3_2")
-async def stream_3_2(req: SolveRequest):
+async def stream_3_2(req: SolveRequest, request: Request):
     from app.solutions import s3_2
-    question_id = "3_2"
-    clear_question_dir(question_id)
-    return make_stream_response(s3_2.stream_s3_2, req.params)
+    return make_stream_response(s3_2.stream_s3_2, req.params, "3_2", isolated_output=True, request=request)
 
 # ===============================================================
 # FILE MANAGEMENT ROUTES
 # ===============================================================
 @app.get("/files/{question_id}")
-async def list_files(question_id: str):
-    """List all CSV and PNG files inside output/<question_id>."""
-    folder_path = os.path.join(OUTPUT_DIR, question_id)
-    if not os.path.exists(folder_path):
+async def list_files(question_id: str, run_id: str = None):
+    """
+    List all CSV and PNG files of one run inside output/<question_id>.
+    Without run_id the most recent run is listed.
+    """
+    try:
+        folder_path, run_id = workspace.resolve_run_dir(question_id, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isdir(folder_path):
         raise HTTPException(status_code=404, detail="Directory not found")
 
-    files = [
-        f"{question_id}/{f}"
-        for f in os.listdir(folder_path)
-        if f.endswith((".csv", ".png"))
-    ]
-    files.sort()
-    return {"available_files": files}
+    prefix = f"{question_id}/{run_id}" if run_id else question_id
+    names = sorted(os.listdir(folder_path))
+    files = [f"{prefix}/{f}" for f in names if f.endswith((".csv", ".png"))]
+    arrays = [f"{prefix}/{f}" for f in names if f.endswith(".npy")]
+    return {"run_id": run_id, "available_files": files, "arrays": arrays}
 
 
 @app.get("/files")
 async def list_all_files():
     """(Optional) List files from all questions (debugging use only)."""
     all_files = []
-    for subfolder in os.listdir(OUTPUT_DIR):
-        folder = os.path.join(OUTPUT_DIR, subfolder)
-        if os.path.isdir(folder):
-            for f in os.listdir(folder):
-                if f.endswith((".csv", ".png")):
-                    all_files.append(f"{subfolder}/{f}")
+    for root, _, files in os.walk(OUTPUT_DIR):
+        rel = os.path.relpath(root, OUTPUT_DIR).replace("\\", "/")
+        if rel == ".":
+            continue
+        for f in files:
+            if f.endswith((".csv", ".png")):
+                all_files.append(f"{rel}/{f}")
     all_files.sort()
     return {"available_files": all_files}
 
 
 @app.get("/preview/{filename:path}")
-async def preview_file(filename: str, lines: int = 10):
-    safe_filename = unquote(filename).replace("\\", "/")
-    file_path = os.path.join(OUTPUT_DIR, safe_filename)
-    file_path = os.path.normpath(file_path)
+def preview_file(filename: str, lines: int = 10, offset: int = 0, columns: str = None):
+    """
+    Text of lines [offset, offset + lines) of a CSV (fewer at the end of
+    the file), optionally only the given columns (e.g. "0,2-4").
+    """
+    file_path = resolve_output_file(filename, ".csv")
+    if lines < 0 or offset < 0:
+        raise HTTPException(status_code=400, detail="lines and offset must be non-negative")
+    try:
+        selected = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        index = csv_index_cache.get(file_path)
+        text_lines = index.read_lines(offset, min(lines, CSV_PAGE_MAX_ROWS))
+        content = "".join(text_lines) if selected is None else rows_to_text(select_rows(text_lines, selected))
+        return {
+            "filename": unquote(filename).replace("\\", "/"),
+            "preview": content,
+            "offset": offset,
+            "lines": len(text_lines),
+            "total_rows": index.rows,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading file: {e}")
 
+def resolve_output_file(filename: str, extension: str):
+    """Absolute path of an existing file under output/, validated against traversal."""
+    safe_filename = unquote(filename).replace("\\", "/")
+    file_path = os.path.normpath(os.path.join(OUTPUT_DIR, safe_filename))
     if not file_path.startswith(os.path.abspath(OUTPUT_DIR)):
         raise HTTPException(status_code=400, detail="Invalid file path")
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
-    if not file_path.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Preview only supports CSV files")
+    if not file_path.lower().endswith(extension):
+        raise HTTPException(status_code=400, detail=f"Only {extension} files are supported")
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"File not found: {safe_filename}")
+    return file_path
 
+@app.get("/array/{filename:path}")
+def array_slice(filename: str, row_start: int = 0, row_stop: int = None,
+                col_start: int = 0, col_stop: int = None, format: str = "raw"):
+    """
+    Serve rows [row_start, row_stop) x columns [col_start, col_stop) of a
+    .npy artifact. The file is memory-mapped, so only the slice is read.
+    format: "raw" (little-endian bytes for a JS typed array, shape and
+    dtype in X-Array-* headers), "npy" or "json".
+    """
+    file_path = resolve_output_file(filename, ".npy")
     try:
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            content = "".join([next(f) for _ in range(lines) if not f.closed])
-        return {"filename": safe_filename, "preview": content}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading file: {e}")
+        array = np.load(file_path, mmap_mode="r")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable array: {e}")
+
+    full_shape = array.shape
+    if array.ndim == 0 or array.ndim > 2:
+        raise HTTPException(status_code=400, detail="Only 1-D and 2-D arrays can be sliced")
+    if array.ndim == 1:
+        array = array[:, None]
+    if min(row_start, col_start) < 0 or (row_stop is not None and row_stop < row_start) \
+            or (col_stop is not None and col_stop < col_start):
+        raise HTTPException(status_code=400, detail="Invalid row/column range")
+    block = np.ascontiguousarray(array[row_start:row_stop, col_start:col_stop])
+    block = block.astype(block.dtype.newbyteorder("<"), copy=False)
+
+    headers = {
+        "X-Array-Dtype": block.dtype.name,
+        "X-Array-Shape": ",".join(map(str, block.shape)),
+        "X-Array-Full-Shape": ",".join(map(str, full_shape)),
+        "X-Array-Offset": f"{row_start},{col_start}",
+    }
+    if format == "json":
+        return {"dtype": block.dtype.name, "shape": list(block.shape), "full_shape": list(full_shape),
+                "offset": [row_start, col_start], "data": block.tolist()}
+    if format == "npy":
+        import io
+        buf = io.BytesIO()
+        np.save(buf, block)
+        return Response(buf.getvalue(), media_type="application/octet-stream", headers=headers)
+    if format == "raw":
+        return Response(block.tobytes(), media_type="application/octet-stream", headers=headers)
+    raise HTTPException(status_code=400, detail="format must be raw, npy or json")
 
 @app.get("/download/{filename:path}")
 def download_file(filename: str):
     """Download a file from any subfolder within output/."""
     safe_filename = filename.replace("\\", "/")  # convert Windows-style paths
-    file_path = os.path.join(OUTPUT_DIR, safe_filename)
-    if os.path.exists(file_path):
+    file_path = os.path.normpath(os.path.join(OUTPUT_DIR, safe_filename))
+    if not file_path.startswith(os.path.abspath(OUTPUT_DIR)):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    if os.path.isfile(file_path):
         return FileResponse(file_path, filename=os.path.basename(file_path))
     raise HTTPException(status_code=404, detail="File not found")
 
 @app.get("/fullcsv/{filename:path}")
-async def full_csv(filename: str):
-    """Return the entire CSV content as a JSON table for frontend rendering."""
-    safe_filename = unquote(filename).replace("\\", "/")
-    file_path = os.path.join(OUTPUT_DIR, safe_filename)
-    file_path = os.path.normpath(file_path)
-
-    if not file_path.startswith(os.path.abspath(OUTPUT_DIR)):
-        raise HTTPException(status_code=400, detail="Invalid file path")
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
-    if not file_path.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Preview only supports CSV files")
-
+def full_csv(filename: str, offset: int = 0, limit: int = CSV_PAGE_MAX_ROWS, columns: str = None):
+    """
+    Rows [offset, offset + limit) of a CSV as a JSON table for frontend
+    rendering (at most CSV_PAGE_MAX_ROWS per request; page with
+    next_offset), optionally only the given columns (e.g. "0,2-4").
+    """
+    file_path = resolve_output_file(filename, ".csv")
+    if limit < 0 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit and offset must be non-negative")
+    try:
+        selected = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        import csv
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.reader(f)
-            rows = [row for row in reader]
-        return {"filename": safe_filename, "rows": rows}
+        rows, total = csv_index_cache.window(file_path, offset, limit, selected)
+        end = offset + len(rows)
+        return {
+            "filename": unquote(filename).replace("\\", "/"),
+            "rows": rows,
+            "offset": offset,
+            "total_rows": total,
+            "next_offset": end if end < total else None,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file: {e}")
\ No newline at end of file
@@ -0,0 +1,326 @@
+# app/run_cache.py
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.events import END_MARKER, is_error_line
+from app.solutions.events import is_marker, metrics
+from app.workspace import link_file
+
+# ===============================================================
+# Content-addressed cache of whole solver runs
+# ===============================================================
+# A successful run is stored under sha256(endpoint, solver source,
+# canonical params), where the solver source covers every module in
+# app/solutions (the shared helpers included): its streamed transcript (lines and markers, with the
+# time each arrived) plus a hard-linked copy of the files it wrote. An
+# identical request later gets the files linked into its own workspace
+# and the transcript replayed at once, with the original run time
+# reported. Entries expire after RUN_CACHE_TTL_SECONDS and the least
+# recently used ones are evicted beyond RUN_CACHE_BYTES.
+#
+# Runs that print an error, hit a job limit or are cancelled before
+# ---END--- are never stored.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # project root (one level above app/)
+SOLUTIONS_DIR = os.path.join(os.path.dirname(__file__), "solutions")
+RUN_CACHE_ENABLED = os.environ.get("RUN_CACHE", "1") != "0"
+RUN_CACHE_DIR = os.environ.get("RUN_CACHE_DIR", os.path.join(BASE_DIR, "cache", "runs"))
+RUN_CACHE_BYTES = int(os.environ.get("RUN_CACHE_BYTES", str(256 * 1024 * 1024)))
+RUN_CACHE_TTL_SECONDS = float(os.environ.get("RUN_CACHE_TTL_SECONDS", "3600"))
+RUN_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("RUN_CACHE_MAX_ENTRY_BYTES", str(16 * 1024 * 1024)))
+
+RUN_DIR_TOKEN = "\x1eRUN_DIR\x1e"  # stands in for the run's output folder inside the transcript
+_INT_STRING = re.compile(r"^[+-]?\d+$")
+
+
+def canonical_params(value):
+    """Params with sorted keys, "5" and 5.0 read as 5, and surrounding whitespace stripped."""
+    if isinstance(value, dict):
+        return {str(k): canonical_params(value[k]) for k in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [canonical_params(v) for v in value]
+    if isinstance(value, str):
+        value = value.strip()
+        return int(value) if _INT_STRING.match(value) else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+_source_hashes = {}
+
+def solver_version(generator_func) -> str:
+    """
+    Hash of the source of every app/solutions module plus the solver's
+    own file, so editing a solver or a helper it uses (collocation,
+    gauss_legendre, artifacts, ...) never hits stale entries.
+    """
+    module = inspect.getmodule(generator_func)
+    name = module.__name__ if module else generator_func.__qualname__
+    if name not in _source_hashes:
+        paths = {os.path.abspath(p) for p in glob.glob(os.path.join(SOLUTIONS_DIR, "*.py"))}
+        try:
+            paths.add(os.path.abspath(inspect.getsourcefile(generator_func)))
+        except TypeError:
+            paths.add(name)  # no source file: fall back to the module name
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(path.encode("utf-8"))
+        _source_hashes[name] = digest.hexdigest()
+    return _source_hashes[name]
+
+
+class RunRecorder:
+    """Transcript of a live run, kept while it is small enough to cache."""
+
+    def __init__(self, run_dir=None, max_bytes=RUN_CACHE_MAX_ENTRY_BYTES):
+        self.run_dir = run_dir
+        self.max_bytes = max_bytes
+        self.items = []
+        self.bytes = 0
+        self.failed = False
+        self.ended = False
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def record(self, batch):
+        if self.failed:
+            return
+        t = round(time.monotonic() - self.started, 6)
+        for item in batch:
+            if isinstance(item, bytes):
+                item = item.decode("utf-8", "replace")
+            if is_marker(item):
+                item = dict(item)
+                if "path" in item and self.run_dir:
+                    item["path"] = item["path"].replace(self.run_dir, RUN_DIR_TOKEN)
+                self.bytes += 64
+            else:
+                if is_error_line(item):
+                    self.failed = True
+                    return
+                if item.strip() == END_MARKER:
+                    self.ended = True
+                if self.run_dir:
+                    item = item.replace(self.run_dir, RUN_DIR_TOKEN)
+                self.bytes += len(item)
+            self.items.append((t, item))
+        self.seconds = t
+        if self.bytes > self.max_bytes:
+            self.failed = True
+            self.items = []
+
+    @property
+    def cacheable(self):
+        return self.ended and not self.failed
+
+
+class RunCache:
+    """Thread-safe, byte- and TTL-bounded LRU of run transcripts and artifacts on disk."""
+
+    def __init__(self, store_dir=RUN_CACHE_DIR, max_bytes=RUN_CACHE_BYTES, ttl=RUN_CACHE_TTL_SECONDS,
+                 enabled=RUN_CACHE_ENABLED):
+        self.store_dir = store_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = ttl
+        self.enabled = enabled and bool(store_dir)
+        self._entries = OrderedDict()  # key -> meta
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.replayed_seconds = 0.0
+
+    def key(self, endpoint, generator_func, params) -> str:
+        blob = json.dumps([endpoint, solver_version(generator_func), canonical_params(params)],
+                          sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.store_dir, key)
+
+    def _load_index(self):
+        # Called with the lock held: pick up entries stored by earlier processes
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.store_dir):
+            return
+        metas = []
+        for key in os.listdir(self.store_dir):
+            if key.startswith("."):
+                continue  # entry still being written
+            try:
+                with open(os.path.join(self._path(key), "meta.json"), encoding="utf-8") as f:
+                    metas.append((key, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        for key, meta in sorted(metas, key=lambda km: km[1].get("last_used", 0)):
+            self._entries[key] = meta
+            self.bytes += meta["bytes"]
+
+    def _expired(self, meta, now):
+        return self.ttl and now - meta["created"] > self.ttl
+
+    def _drop(self, key):
+        # Called with the lock held
+        meta = self._entries.pop(key)
+        self.bytes -= meta["bytes"]
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def get(self, key):
+        """(meta, transcript) of a live entry, or None. Counts a hit or a miss."""
+        with self._lock:
+            self._load_index()
+            meta = self._entries.get(key)
+            if meta is not None and self._expired(meta, time.time()):
+                self._drop(key)
+                self.evictions += 1
+                meta = None
+            if meta is None:
+                self.misses += 1
+                return None
+            try:
+                with open(os.path.join(self._path(key), "transcript.json"), encoding="utf-8") as f:
+                    transcript = json.load(f)
+            except (OSError, ValueError):
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            meta["last_used"] = time.time()
+            self.hits += 1
+            self.replayed_seconds += meta["seconds"]
+            return meta, transcript
+
+    def restore_files(self, key, meta, run_dir):
+        """Link (or copy) the entry's artifacts into a fresh run workspace."""
+        if not meta["files"]:
+            return
+        files_dir = os.path.join(self._path(key), "files")
+        for name in meta["files"]:
+            link_file(os.path.join(files_dir, name), os.path.join(run_dir, name))
+
+    def put(self, key, endpoint, params, recorder):
+        """Store a finished run's transcript and the files of its workspace."""
+        if not recorder.cacheable:
+            return False
+        names = []
+        if recorder.run_dir and os.path.isdir(recorder.run_dir):
+            names = sorted(f for f in os.listdir(recorder.run_dir)
+                           if os.path.isfile(os.path.join(recorder.run_dir, f)))
+        transcript = json.dumps(recorder.items)
+        size = len(transcript) + sum(os.path.getsize(os.path.join(recorder.run_dir, f)) for f in names)
+        if size > min(self.max_bytes, RUN_CACHE_MAX_ENTRY_BYTES):
+            return False
+
+        tmp = os.path.join(self.store_dir, f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+        meta = {
+            "endpoint": endpoint,
+            "params": canonical_params(params),
+            "created": time.time(),
+            "last_used": time.time(),
+            "seconds": recorder.seconds,
+            "bytes": size,
+            "files": names,
+        }
+        try:
+            os.makedirs(os.path.join(tmp, "files"))
+            for name in names:
+                # artifacts are never rewritten once the run is done
+                link_file(os.path.join(recorder.run_dir, name), os.path.join(tmp, "files", name))
+            with open(os.path.join(tmp, "transcript.json"), "w", encoding="utf-8") as f:
+                f.write(transcript)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+
+        with self._lock:
+            self._load_index()
+            if key in self._entries:
+                self._drop(key)
+            try:
+                os.replace(tmp, self._path(key))
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return False
+            self._entries[key] = meta
+            self.bytes += size
+            self.stores += 1
+            now = time.time()
+            for old in [k for k, m in self._entries.items() if self._expired(m, now)]:
+                self._drop(old)
+                self.evictions += 1
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def replay(self, meta, transcript, run_dir=None):
+        """Batches of the cached transcript, with paths pointing into run_dir."""
+        yield [
+            f"♻️ Cached result: replaying a run that took {meta['seconds']:.3f}s to compute\n",
+            metrics(cached=True, original_seconds=meta["seconds"]),
+        ]
+        target = run_dir or ""
+        batch, batch_time = [], None
+        for t, item in transcript:
+            if batch and t != batch_time:
+                yield batch
+                batch = []
+            batch_time = t
+            if isinstance(item, dict):
+                if "path" in item:
+                    item = dict(item, path=item["path"].replace(RUN_DIR_TOKEN, target))
+            else:
+                item = item.replace(RUN_DIR_TOKEN, target)
+            batch.append(item)
+        if batch:
+            yield batch
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._entries):
+                self._drop(key)
+            self.hits = self.misses = self.stores = self.evictions = 0
+            self.replayed_seconds = 0.0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "compute_seconds_saved": round(self.replayed_seconds, 3),
+            }
+
+
+run_cache = RunCache()
@@ -0,0 +1,250 @@
+# app/single_flight.py
+import asyncio
+import os
+import shutil
+import tempfile
+
+from app.executor import solver_pool, job_limits, STREAM_CHUNK_BYTES, STREAM_CHUNK_SECONDS
+from app.run_cache import run_cache, RunRecorder, BASE_DIR
+from app.solutions.events import is_marker
+from app.workspace import link_file
+
+# ===============================================================
+# Single-flight runs
+# ===============================================================
+# Identical concurrent requests (same run-cache key) share one solver run.
+# The run is driven by a background task that computes into a private
+# scratch folder and fans each batch of output out to its subscribers.
+# Every subscriber has its own bounded buffer, so a slow client never
+# stalls the others. Its output paths are rewritten to its own run
+# workspace, and finished artifacts are hard-linked into that workspace.
+#
+# A subscriber that falls FLIGHT_BUFFER_BATCHES behind is cut off only
+# while another subscriber is keeping up. When every subscriber is behind
+# (always the case for a lone client) the flight waits for one to drain,
+# which stops reading the solver and so slows it to the client's pace,
+# like an unshared run. A flight keeps its output history for late
+# joiners up to FLIGHT_HISTORY_BYTES; past that it stops accepting new
+# subscribers. The solver is cancelled once every subscriber has left.
+
+SINGLE_FLIGHT_ENABLED = os.environ.get("SINGLE_FLIGHT", "1") != "0"
+FLIGHT_BUFFER_BATCHES = int(os.environ.get("FLIGHT_BUFFER_BATCHES", "256"))
+FLIGHT_HISTORY_BYTES = int(os.environ.get("FLIGHT_HISTORY_BYTES", str(4 * 1024 * 1024)))
+FLIGHT_DIR = os.environ.get("FLIGHT_DIR", os.path.join(BASE_DIR, "cache", "flights"))
+SUBSCRIBER_POLL_SECONDS = 1.0
+
+_CLOSED = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class _Subscriber:
+    def __init__(self, max_batches):
+        self.queue = asyncio.Queue()  # bounded by max_batches below; the close marker always fits
+        self.max_batches = max_batches
+        self.overflowed = False
+
+    def full(self) -> bool:
+        return self.queue.qsize() >= self.max_batches
+
+
+class Flight:
+    """One in-flight solver run and the clients subscribed to its output."""
+
+    def __init__(self, key, scratch_dir=None, max_batches=FLIGHT_BUFFER_BATCHES,
+                 max_history_bytes=FLIGHT_HISTORY_BYTES):
+        self.key = key
+        self.scratch_dir = scratch_dir
+        self.max_batches = max_batches
+        self.max_history_bytes = max_history_bytes
+        self.history = []
+        self.history_bytes = 0
+        self.joinable = True
+        self.closed = False
+        self.failure = None
+        self.subscribers = set()
+        self.overflows = 0
+        self.task = None
+        self._drained = asyncio.Event()  # set whenever a subscriber takes a batch or leaves
+
+    async def publish(self, batch):
+        """Hand batch to every subscriber, waiting while all of them are behind."""
+        if self.joinable:
+            self.history.append(batch)
+            self.history_bytes += sum(len(i) for i in batch if isinstance(i, (str, bytes)))
+            if self.history_bytes > self.max_history_bytes:
+                self.joinable = False
+                self.history = []
+        while True:
+            behind = [sub for sub in self.subscribers if sub.full()]
+            if not behind:
+                break
+            if len(behind) < len(self.subscribers):
+                # Others are keeping up: drop the laggards rather than stall them
+                for sub in behind:
+                    sub.overflowed = True
+                    self.subscribers.discard(sub)
+                    self.overflows += 1
+                break
+            self._drained.clear()
+            await self._drained.wait()
+        for sub in self.subscribers:
+            sub.queue.put_nowait(batch)
+
+    def close(self, failure=None):
+        self.closed = True
+        self.joinable = False
+        self.failure = failure
+        self.history = []
+        for sub in self.subscribers:
+            sub.queue.put_nowait(_CLOSED if failure is None else _Failure(failure))
+        self._cleanup()
+
+    def _cleanup(self):
+        if self.closed and not self.subscribers and self.scratch_dir:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            self.scratch_dir = None
+
+    async def is_abandoned(self):
+        return not self.subscribers
+
+    async def subscribe(self, is_disconnected=None, on_close=None):
+        """
+        Yield the flight's batches (history first) until it closes;
+        on_close() runs when it closes normally, while its files still exist.
+        """
+        sub = _Subscriber(self.max_batches)
+        self.subscribers.add(sub)
+        backlog = list(self.history)
+        try:
+            for batch in backlog:
+                yield batch
+            while True:
+                if sub.overflowed and sub.queue.empty():
+                    yield ["Error: this client fell too far behind a run shared with other "
+                           "clients and was disconnected; please retry.\n", "---END---\n"]
+                    return
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), SUBSCRIBER_POLL_SECONDS)
+                    self._drained.set()
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    continue
+                if item is _CLOSED:
+                    if on_close is not None:
+                        on_close()
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield item
+        finally:
+            self.subscribers.discard(sub)
+            self._drained.set()
+            self._cleanup()
+
+
+class FlightRegistry:
+    """Joinable flights by run key, plus counters for /metrics."""
+
+    def __init__(self, enabled=SINGLE_FLIGHT_ENABLED, scratch_root=FLIGHT_DIR):
+        self.enabled = enabled
+        self.scratch_root = scratch_root
+        self.flights = {}
+        self.started = 0
+        self.joined = 0
+        self.overflows = 0
+
+    def _start(self, key, generator_func, params, endpoint, isolated):
+        scratch_dir = None
+        if isolated:
+            os.makedirs(self.scratch_root, exist_ok=True)
+            scratch_dir = tempfile.mkdtemp(prefix=f"{endpoint}-", dir=self.scratch_root)
+        flight = self.flights[key] = Flight(key, scratch_dir)
+        flight.task = asyncio.create_task(self._drive(flight, generator_func, params, endpoint))
+        self.started += 1
+        return flight
+
+    async def _drive(self, flight, generator_func, params, endpoint):
+        kwargs = {"output_dir": flight.scratch_dir} if flight.scratch_dir else {}
+        recorder = RunRecorder(flight.scratch_dir)
+        failure = None
+        try:
+            ahead = solver_pool.queue_position()
+            if ahead > 0:
+                await flight.publish([f"Waiting for a free solver slot ({ahead} run(s) ahead)...\n"])
+            batches = solver_pool.stream(
+                generator_func, (params,), kwargs,
+                limits=job_limits(endpoint),
+                is_disconnected=flight.is_abandoned,
+                batch_bytes=STREAM_CHUNK_BYTES,
+                batch_seconds=STREAM_CHUNK_SECONDS,
+            )
+            try:
+                async for batch in batches:
+                    recorder.record(batch)
+                    await flight.publish(batch)
+                    if not flight.subscribers:
+                        break
+            finally:
+                await batches.aclose()
+            if run_cache.enabled and recorder.cacheable:
+                await asyncio.to_thread(run_cache.put, flight.key, endpoint, params, recorder)
+        except Exception as e:
+            failure = e
+        finally:
+            if self.flights.get(flight.key) is flight:
+                del self.flights[flight.key]
+            self.overflows += flight.overflows
+            flight.close(failure)
+
+    async def stream(self, key, generator_func, params, endpoint, run_dir=None, is_disconnected=None):
+        """
+        Batches of the shared run for key, joining an in-flight one when
+        possible. Paths are rewritten to run_dir and artifacts linked there.
+        """
+        flight = self.flights.get(key)
+        if flight is not None and flight.joinable:
+            self.joined += 1
+        else:
+            flight = self._start(key, generator_func, params, endpoint, isolated=run_dir is not None)
+        scratch_dir = flight.scratch_dir
+        if not scratch_dir or not run_dir:
+            async for batch in flight.subscribe(is_disconnected):
+                yield batch
+            return
+
+        def link_remaining():
+            # The run is over: link whatever else it wrote
+            for name in os.listdir(scratch_dir):
+                src = os.path.join(scratch_dir, name)
+                if os.path.isfile(src):
+                    link_file(src, os.path.join(run_dir, name))
+
+        async for batch in flight.subscribe(is_disconnected, on_close=link_remaining):
+            out = []
+            for item in batch:
+                if is_marker(item) and "path" in item:
+                    item = dict(item, path=item["path"].replace(scratch_dir, run_dir))
+                    link_file(os.path.join(scratch_dir, os.path.basename(item["path"])), item["path"])
+                elif isinstance(item, str):
+                    item = item.replace(scratch_dir, run_dir)
+                out.append(item)
+            yield out
+
+    def stats(self):
+        flights = list(self.flights.values())
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(flights),
+            "subscribers": sum(len(f.subscribers) for f in flights),
+            "started": self.started,
+            "joined": self.joined,
+            "overflows": self.overflows + sum(f.overflows for f in flights),
+        }
+
+
+flights = FlightRegistry()
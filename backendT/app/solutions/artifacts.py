@@ -0,0 +1,186 @@
+# app/solutions/artifacts.py
+import os
+import queue
+import threading
+import time
+import numpy as np
+from app.solutions.events import artifact
+
+# ============================================================
+# Background CSV artifact writer
+# ============================================================
+# Solvers hand arrays to a CsvWriter as soon as they exist. A writer thread
+# formats them in chunks (one %-format over the whole chunk rather than a
+# call per row or per value) and appends them to the file, so formatting
+# and disk I/O overlap with the computation that keeps streaming.
+#
+# Matrices and grids can also be saved as .npy next to the CSV; the
+# /array endpoint memory-maps those and serves typed slices without any
+# text parsing.
+
+CSV_CHUNK_ROWS = 4096  # rows formatted per chunk
+CSV_QUEUE_CHUNKS = 8   # chunks buffered before the producer waits
+
+_CLOSE = object()
+
+
+def format_rows(block, fmt):
+    """
+    CSV text for a block of rows. block is a 2-D array (one fmt for every
+    column, or a list with one per column) or a list of equal-length 1-D
+    columns of any dtype with one fmt each.
+    """
+    if isinstance(block, np.ndarray):
+        n_rows, n_cols = block.shape
+        values = block.ravel().tolist()
+    else:
+        n_rows, n_cols = len(block[0]), len(block)
+        flat = np.empty(n_rows * n_cols, dtype=object)
+        for j, col in enumerate(block):
+            flat[j::n_cols] = np.asarray(col).tolist()
+        values = flat.tolist()
+    fmts = [fmt] * n_cols if isinstance(fmt, str) else list(fmt)
+    row = ",".join(fmts) + "\n"
+    return (row * n_rows) % tuple(values)
+
+
+class CsvWriter:
+    """Append-only CSV file fed from the solver thread and written on a background thread."""
+
+    def __init__(self, path, header=None, fmt="%r", chunk_rows=CSV_CHUNK_ROWS):
+        self.path = path
+        self.fmt = fmt
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.bytes = 0
+        self.rows = 0
+        self.format_seconds = 0.0
+        self.write_seconds = 0.0
+        self.seconds = 0.0
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=CSV_QUEUE_CHUNKS)
+        self._file = open(path, "wb")
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+        self._thread.start()
+        if header is not None:
+            self._queue.put(f"{header}\n")
+
+    def write(self, rows):
+        """Queue a 2-D array of rows (a 1-D array is written as one column)."""
+        rows = np.array(rows)
+        if rows.ndim == 1:
+            rows = rows[:, None]
+        for s in range(0, len(rows), self.chunk_rows):
+            self._queue.put(rows[s:s + self.chunk_rows])
+
+    def write_columns(self, *columns):
+        """Queue rows given as separate columns (e.g. labels next to numbers)."""
+        columns = [np.array(c) for c in columns]
+        for s in range(0, len(columns[0]), self.chunk_rows):
+            self._queue.put([c[s:s + self.chunk_rows] for c in columns])
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks
+            try:
+                t0 = time.perf_counter()
+                if isinstance(item, str):
+                    data = item.encode()
+                else:
+                    data = format_rows(item, self.fmt).encode()
+                    self.rows += len(item) if isinstance(item, np.ndarray) else len(item[0])
+                t1 = time.perf_counter()
+                self._file.write(data)
+                self.write_seconds += time.perf_counter() - t1
+                self.format_seconds += t1 - t0
+                self.bytes += len(data)
+            except Exception as e:
+                self._error = e
+
+    def close(self):
+        """Wait for queued rows to reach disk; re-raises a writer-thread error."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._file.close()
+            self.seconds = time.perf_counter() - self._started
+        if self._error is not None:
+            raise self._error
+        return self.stats()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "format_seconds": self.format_seconds,
+            "write_seconds": self.write_seconds,
+            "seconds": self.seconds,
+        }
+
+
+class ArtifactWriters:
+    """The CSV and .npy artifacts of one run, flushed together before the run ends."""
+
+    def __init__(self):
+        self.writers = []
+        self.binaries = []  # (path, bytes) of .npy artifacts
+        self.completed = []  # paths finished since the last ready()
+
+    def csv(self, path, header=None, fmt="%r"):
+        writer = CsvWriter(path, header=header, fmt=fmt)
+        self.writers.append(writer)
+        return writer
+
+    def save(self, path, rows, header=None, fmt="%r", npy=False):
+        """
+        Queue a whole array as one CSV artifact (np.savetxt replacement);
+        with npy=True the same array is also saved as <name>.npy.
+        """
+        self.csv(path, header=header, fmt=fmt).write(rows)
+        if npy:
+            self.save_npy(os.path.splitext(path)[0] + ".npy", rows)
+
+    def save_npy(self, path, array):
+        """Save a binary (memory-mappable) .npy artifact."""
+        np.save(path, np.asarray(array))
+        self.binaries.append((path, os.path.getsize(path)))
+
+    def finish(self):
+        """Close every writer and return report lines for the stream."""
+        stats = [w.close() for w in self.writers]
+        binaries, self.writers, self.binaries = self.binaries, [], []
+        self.completed.extend(s["path"] for s in stats)
+        self.completed.extend(path for path, _ in binaries)
+        lines = []
+        if stats:
+            total = sum(s["bytes"] for s in stats)
+            busy = sum(s["format_seconds"] + s["write_seconds"] for s in stats)
+            lines.append(f"Artifacts written: {len(stats)} file(s), {total / 1024:.1f} KB, "
+                         f"{busy:.3f}s formatting/writing on the writer thread")
+            for s in stats:
+                lines.append(f"  • {os.path.basename(s['path'])}: {s['bytes'] / 1024:.1f} KB, {s['rows']} rows "
+                             f"(format {s['format_seconds']:.3f}s, write {s['write_seconds']:.3f}s)")
+        for path, size in binaries:
+            lines.append(f"  • {os.path.basename(path)}: {size / 1024:.1f} KB (binary)")
+        return lines
+
+    def ready(self):
+        """Artifact markers for every file completed by finish() so far."""
+        completed, self.completed = self.completed, []
+        return [artifact(path) for path in completed]
+
+    def abort(self):
+        """Close writers after a failure without raising."""
+        for w in self.writers:
+            try:
+                w.close()
+            except Exception:
+                pass
+        self.writers = []
@@ -0,0 +1,98 @@
+# app/solutions/collocation.py
+import numpy as np
+from app.solutions.gauss_legendre import cached_gauss_legendre
+
+# ============================================================
+# Shared collocation helpers (used by s3_1, s3_2, s3_2_plot_api)
+# ============================================================
+
+def gl_roots_with_endpoints(n):
+    """Shifted Gauss-Legendre roots on [0, 1] with both endpoints added."""
+    x, _ = cached_gauss_legendre(n, (0.0, 1.0))
+    return np.concatenate(([0.0], x, [1.0]))
+
+def bary_weights(x):
+    """
+    Barycentric weights w_j = 1 / prod_{k != j} (x_j - x_k).
+    Computed in log space and normalised, since only ratios matter and the
+    raw products under/overflow once n reaches the hundreds.
+    """
+    x = np.asarray(x, dtype=float)
+    diff = x[:, None] - x[None, :]
+    np.fill_diagonal(diff, 1.0)
+    log_abs = -np.sum(np.log(np.abs(diff)), axis=1)
+    sign = np.prod(np.sign(diff), axis=1)
+    return sign * np.exp(log_abs - log_abs.max())
+
+def diff_matrix(x, w=None):
+    """First-derivative matrix D with D @ f(x) ~ f'(x) (no matrix inverse)."""
+    x = np.asarray(x, dtype=float)
+    if w is None:
+        w = bary_weights(x)
+    dx = x[:, None] - x[None, :]
+    np.fill_diagonal(dx, 1.0)
+    D = (w[None, :] / w[:, None]) / dx
+    np.fill_diagonal(D, 0.0)
+    np.fill_diagonal(D, -D.sum(axis=1))
+    return D
+
+def diff_matrices(x, w=None):
+    """
+    Return (A, B): first- and second-derivative matrices on the nodes x.
+    B uses the closed-form barycentric expression instead of D @ D.
+    """
+    x = np.asarray(x, dtype=float)
+    if w is None:
+        w = bary_weights(x)
+    A = diff_matrix(x, w)
+    dx = x[:, None] - x[None, :]
+    np.fill_diagonal(dx, 1.0)
+    B = 2.0 * A * (np.diag(A)[:, None] - 1.0 / dx)
+    np.fill_diagonal(B, 0.0)
+    np.fill_diagonal(B, -B.sum(axis=1))
+    return A, B
+
+def bary_interp(x, w, y, z):
+    """Evaluate the interpolant through (x, y) at an array z (second barycentric form)."""
+    z = np.asarray(z, dtype=float)
+    num = np.zeros_like(z)
+    den = np.zeros_like(z)
+    exact = np.full(z.shape, -1, dtype=int)
+    for j in range(len(x)):
+        dz = z - x[j]
+        hit = dz == 0
+        exact[hit] = j
+        dz[hit] = 1.0
+        t = w[j] / dz
+        num += t * y[j]
+        den += t
+    out = num / den
+    hit = exact >= 0
+    out[hit] = np.asarray(y)[exact[hit]]
+    return out
+
+# ============================================================
+# Temperature-profile collocation system (Assignment 3.2)
+# ============================================================
+
+def coeff_2nd_diff(x): return x
+def coeff_1st_diff(x): return 1 + 2 * np.log(np.maximum(x, 1e-12))
+
+def solve_collocation(x, A, B, y_left=1.0, y_right=0.0):
+    """
+    Solve x y'' + (1 + 2 ln x) y' = 0 at the interior nodes with
+    Dirichlet values at both ends; returns the nodal values y.
+    """
+    m = len(x)
+    y = np.zeros(m)
+    y[0] = y_left
+    y[m - 1] = y_right
+
+    inner = slice(1, m - 1)
+    xi = x[inner]
+    coeffs = coeff_2nd_diff(xi)[:, None] * B[inner] + coeff_1st_diff(xi)[:, None] * A[inner]
+
+    C = coeffs[:, inner]
+    Dv = -(y[0] * coeffs[:, 0] + y[m - 1] * coeffs[:, m - 1])
+    y[inner] = np.linalg.solve(C, Dv)
+    return y
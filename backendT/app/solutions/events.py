@@ -0,0 +1,26 @@
+# app/solutions/events.py
+
+# ============================================================
+# Structured stream markers
+# ============================================================
+# Solvers yield these small dicts between their text lines. The plain-text
+# stream skips them; the event stream (Accept: text/event-stream or
+# ?format=sse) turns them into typed progress / artifact / metrics events.
+
+def progress(fraction, stage=None):
+    """Fraction of the run completed (clamped to [0, 1])."""
+    event = {"event": "progress", "fraction": min(1.0, max(0.0, float(fraction)))}
+    if stage:
+        event["stage"] = stage
+    return event
+
+def artifact(path):
+    """A file in the run's output folder is complete and can be fetched."""
+    return {"event": "artifact", "path": path}
+
+def metrics(**values):
+    """Solver-reported numbers (timings, iteration counts, ...)."""
+    return {"event": "metrics", **values}
+
+def is_marker(item):
+    return isinstance(item, dict) and "event" in item
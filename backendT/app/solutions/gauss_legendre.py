@@ -0,0 +1,238 @@
+# app/solutions/gauss_legendre.py
+import os
+import threading
+import uuid
+from collections import OrderedDict
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+from scipy.special import jn_zeros, j1
+
+# ============================================================
+# Gauss-Legendre nodes and weights for any degree
+# ============================================================
+# Small degrees use numpy's leggauss. From ASYMPTOTIC_MIN_N on, nodes and
+# weights come from Bogaert's asymptotic expansions in terms of the zeros
+# of J0 (I. Bogaert, SIAM J. Sci. Comput. 36 (2014) A1008-A1026). Every
+# pair costs O(1), so degrees of 10^6 take a fraction of a second, and
+# the results are accurate to double precision.
+
+ASYMPTOTIC_MIN_N = 101
+
+_J0_ZEROS = jn_zeros(0, 20)
+_J1_SQUARED = j1(jn_zeros(0, 21)) ** 2
+
+def bessel_j0_zeros(k):
+    """k-th positive zero of J0 (k >= 1, array): tabulated, then McMahon's series."""
+    k = np.asarray(k)
+    z = np.pi * (k - 0.25)
+    r = 1.0 / z
+    r2 = r * r
+    z = z + r * (0.125 + r2 * (-0.807291666666666666666666666667e-1 + r2 * (0.246028645833333333333333333333
+        + r2 * (-1.82443876720610119047619047619 + r2 * (25.3364147973439050099206349206
+        + r2 * (-567.644412135183381139802038240 + r2 * (18690.4765282320653831636345064
+        + r2 * (-8.49353580299148769921876983660e5 + 5.09225462402226769498681286758e7 * r2))))))))
+    small = k <= len(_J0_ZEROS)
+    z[small] = _J0_ZEROS[k[small] - 1]
+    return z
+
+def bessel_j1_squared(k):
+    """J1(j_{0,k})^2 at the k-th zero of J0 (array)."""
+    k = np.asarray(k)
+    x = 1.0 / (k - 0.25)
+    x2 = x * x
+    v = x * (0.202642367284675542887092416902 + x2 * x2 * (-0.303380429711290253026202643516e-3
+        + x2 * (0.198924364245969295201137972743e-3 + x2 * (-0.228969902772111653038747229723e-3
+        + x2 * (0.433710719130746277915572905025e-3 + x2 * (-0.123632349727175414724737657367e-2
+        + x2 * (0.496101423268883102872271417616e-2 + x2 * (-0.266837393702323757700998557826e-1
+        + 0.185395398206345628711318848386 * x2))))))))
+    small = k <= len(_J1_SQUARED)
+    v[small] = _J1_SQUARED[k[small] - 1]
+    return v
+
+def asymptotic_pairs(n, k):
+    """(theta_k, w_k) with x_k = cos(theta_k) for the k-th node of degree n, k <= (n + 1) / 2."""
+    w = 1.0 / (n + 0.5)
+    nu = bessel_j0_zeros(k)
+    theta = w * nu
+    x = theta * theta
+    B = bessel_j1_squared(k)
+
+    # Chebyshev interpolants of the node ...
+    SF1T = (((((-1.29052996274280508473467968379e-12 * x + 2.40724685864330121825976175184e-10) * x
+            - 3.13148654635992041468855740012e-8) * x + 0.275573168962061235623801563453e-5) * x
+            - 0.148809523713909147898955880165e-3) * x + 0.416666666665193394525296923981e-2) * x \
+        - 0.416666666666662959639712457549e-1
+    SF2T = (((((+2.20639421781871003734786884322e-9 * x - 7.53036771373769326811030753538e-8) * x
+            + 0.161969259453836261731700382098e-5) * x - 0.253300326008232025914059965302e-4) * x
+            + 0.282116886057560434805998583817e-3) * x - 0.209022248387852902722635654229e-2) * x \
+        + 0.815972221772932265640401128517e-2
+    SF3T = (((((-2.97058225375526229899781956673e-8 * x + 5.55845330223796209655886325712e-7) * x
+            - 0.567797841356833081642185432056e-5) * x + 0.418498100329504574443885193835e-4) * x
+            - 0.251395293283965914823026348764e-3) * x + 0.128654198542845137196151147483e-2) * x \
+        - 0.416012165620204364833694266818e-2
+
+    # ... and of the weight
+    WSF1T = ((((((((-2.20902861044616638398573427475e-14 * x + 2.30365726860377376873232578871e-12) * x
+            - 1.75257700735423807659851042318e-10) * x + 1.03756066927916795821098009353e-8) * x
+            - 4.63968647553221331251529631098e-7) * x + 0.149644593625028648361395938176e-4) * x
+            - 0.326278659594412170300449074873e-3) * x + 0.436507936507598105249726413120e-2) * x
+            - 0.305555555555553028279487898503e-1) * x + 0.833333333333333302184063103900e-1
+    WSF2T = (((((((+3.63117412152654783455929483029e-12 * x + 7.67643545069893130779501844323e-11) * x
+            - 7.12912857233642220650643150625e-9) * x + 2.11483880685947151466370130277e-7) * x
+            - 0.381817918680045468483009307090e-5) * x + 0.465969530694968391417927388162e-4) * x
+            - 0.407297185611335764191683161117e-3) * x + 0.268959435694729660779984493795e-2) * x \
+        - 0.111111111111214923138249347172e-1
+    WSF3T = (((((((+2.01826791256703301806643264922e-9 * x - 4.38647122520206649251063212545e-8) * x
+            + 5.08898347288671653137451093208e-7) * x - 0.397933316519135275712977531366e-5) * x
+            + 0.200559326396458326778521795392e-4) * x - 0.422888059282921161626339411388e-4) * x
+            - 0.105646050254076140548678457002e-3) * x - 0.947969308958577323145923317955e-4) * x \
+        + 0.656966489926484797412985260842e-2
+
+    nu_o_sin = nu / np.sin(theta)
+    b_nu_o_sin = B * nu_o_sin
+    w_inv_sinc = w * w * nu_o_sin
+    wis2 = w_inv_sinc * w_inv_sinc
+
+    theta = w * (nu + theta * w_inv_sinc * (SF1T + wis2 * (SF2T + wis2 * SF3T)))
+    deno = b_nu_o_sin + b_nu_o_sin * wis2 * (WSF1T + wis2 * (WSF2T + wis2 * WSF3T))
+    return theta, (2.0 * w) / deno
+
+def gauss_legendre_asymptotic(n):
+    """Nodes (ascending) and weights on [-1, 1] from the asymptotic expansions, O(n)."""
+    k = np.arange(1, (n + 1) // 2 + 1)
+    theta, w = asymptotic_pairs(n, k)
+    x = np.cos(theta)  # positive half, largest node first
+    m = n // 2  # nodes mirrored into the negative half
+    nodes = np.concatenate((-x[:m], x[::-1]))
+    weights = np.concatenate((w[:m], w[::-1]))
+    return nodes, weights
+
+def gauss_legendre(n):
+    """Gauss-Legendre nodes (ascending) and weights on [-1, 1] for any degree n >= 1."""
+    if n < ASYMPTOTIC_MIN_N:
+        return leggauss(n)
+    return gauss_legendre_asymptotic(n)
+
+
+# ============================================================
+# Process-wide node/weight cache
+# ============================================================
+# Keyed by (n, domain) and bounded by the bytes it holds. Rules of degree
+# GL_PERSIST_MIN_N and up are also stored as one .npz per key under
+# GL_CACHE_DIR, so solver worker processes (and restarts) start warm.
+# GL_PREWARM lists degrees to build at startup, e.g. "5,6,20,1000".
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+GL_CACHE_BYTES = int(os.environ.get("GL_CACHE_BYTES", str(64 * 1024 * 1024)))
+GL_CACHE_DIR = os.environ.get("GL_CACHE_DIR", os.path.join(BASE_DIR, "cache", "gauss_legendre"))
+GL_PERSIST_MIN_N = int(os.environ.get("GL_PERSIST_MIN_N", "1000"))
+GL_PREWARM = [int(n) for n in os.environ.get("GL_PREWARM", "").split(",") if n.strip()]
+
+class GaussLegendreCache:
+    """Thread-safe, byte-bounded LRU of Gauss-Legendre rules with an optional .npz store."""
+
+    def __init__(self, max_bytes=GL_CACHE_BYTES, store_dir=GL_CACHE_DIR, persist_min_n=GL_PERSIST_MIN_N):
+        self.max_bytes = max(0, int(max_bytes))
+        self.store_dir = store_dir or None
+        self.persist_min_n = persist_min_n
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        n, a, b = key
+        return os.path.join(self.store_dir, f"gl_{n}_{a:.17g}_{b:.17g}.npz")
+
+    def _load(self, key):
+        if not self.store_dir or key[0] < self.persist_min_n:
+            return None
+        try:
+            with np.load(self._path(key)) as data:
+                return data["x"], data["w"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _store(self, key, x, w):
+        if not self.store_dir or key[0] < self.persist_min_n:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez(f, x=x, w=w)
+            os.replace(tmp, path)  # atomic, so concurrent workers never see partial files
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def get(self, n, domain=(-1.0, 1.0)):
+        """Nodes (ascending) and weights of the n-point rule on domain, as read-only arrays."""
+        key = (int(n), float(domain[0]), float(domain[1]))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        pair = self._load(key)
+        with self._lock:
+            if pair is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+        if pair is None:
+            # Build outside the lock so a large degree doesn't block other keys
+            a, b = key[1], key[2]
+            xi, wi = gauss_legendre(key[0])
+            pair = (a + (b - a) * (xi + 1.0) / 2.0, (b - a) / 2.0 * wi)
+            self._store(key, *pair)
+        for arr in pair:
+            arr.setflags(write=False)
+
+        size = pair[0].nbytes + pair[1].nbytes
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = pair
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (x_old, w_old) = self._entries.popitem(last=False)
+                    self.bytes -= x_old.nbytes + w_old.nbytes
+                    self.evictions += 1
+        return pair
+
+    def prewarm(self, degrees, domains=((0.0, 1.0),)):
+        for n in degrees:
+            for domain in domains:
+                self.get(n, domain)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+
+gl_cache = GaussLegendreCache()
+
+def cached_gauss_legendre(n, domain=(-1.0, 1.0)):
+    """Gauss-Legendre nodes and weights on domain from the shared cache (read-only arrays)."""
+    return gl_cache.get(n, domain)
@@ -1,13 +1,13 @@
 # app/solutions/s2_1a.py
-import sys
+import hashlib
+from app.solutions.events import progress
 
 # ============================================================
 # Helper functions
 # ============================================================
 
 def flush_line(line: str):
-    """Force immediate flush of a line for true real-time streaming."""
-    sys.stdout.flush()
+    """Terminate a line for streaming (make_stream_response batches the writes)."""
     return f"{line.rstrip()}\n"
 
 def factorial(i):
@@ -18,12 +18,72 @@ def factorial(i):
     return f
 
 def Check_Harshad(f):
-    num = str(f)
-    s = sum(int(d) for d in num)
+    s, _ = digit_sum_and_count(f)
     if s == 0:
         return False
     return f % s == 0
 
+# ------------------------------------------------------------
+# Divide-and-conquer digit sums for huge integers
+# ------------------------------------------------------------
+# str(f) on a factorial is quadratic in its digit count (and refused past
+# Python's int->str digit limit). Splitting f by cached powers 10**k and
+# only converting small leaves keeps every conversion short.
+
+LEAF_DIGITS = 512
+_POW10 = {}
+
+def _pow10(k):
+    p = _POW10.get(k)
+    if p is None:
+        p = _POW10[k] = 10 ** k
+    return p
+
+def _split_digits(n):
+    """Largest LEAF_DIGITS * 2**j split point below half of n's digit count."""
+    approx_digits = int(n.bit_length() * 0.30103)
+    k = LEAF_DIGITS
+    while 4 * k <= approx_digits:
+        k *= 2
+    return k
+
+def _text_digit_sum(text):
+    return sum(d * text.count(str(d)) for d in range(1, 10))
+
+def digit_sum_and_count(n, pad=0):
+    """Return (digit sum, digit count) of n >= 0; pad = minimum digit count."""
+    if n < _pow10(LEAF_DIGITS):
+        text = str(n) if n or not pad else ""
+        return _text_digit_sum(text), max(len(text), pad)
+    k = _split_digits(n)
+    hi, lo = divmod(n, _pow10(k))
+    s_hi, c_hi = digit_sum_and_count(hi)
+    s_lo, _ = digit_sum_and_count(lo, pad=k)
+    return s_hi + s_lo, c_hi + k
+
+def int_to_str(n):
+    """str(n) for n >= 0 of any size, by the same recursive splitting."""
+    if n < _pow10(LEAF_DIGITS):
+        return str(n)
+    k = _split_digits(n)
+    hi, lo = divmod(n, _pow10(k))
+    return int_to_str(hi) + int_to_str(lo).zfill(k)
+
+def describe_value(f, show):
+    """
+    (digit sum, text shown) for a factorial value: full digits, digit
+    count, or a hash. The full text is built once and summed directly;
+    the other modes only need the split digit sum.
+    """
+    if show == "full":
+        text = int_to_str(f)
+        return _text_digit_sum(text), text
+    s, digit_count = digit_sum_and_count(f)
+    if show == "digits":
+        return s, f"<{digit_count} digits>"
+    digest = hashlib.sha256(f.to_bytes((f.bit_length() + 7) // 8 or 1, "big")).hexdigest()
+    return s, f"<{digit_count} digits, sha256 {digest[:16]}>"
+
 
 def stream_s2_1a(params):
     """
@@ -31,14 +91,20 @@ def stream_s2_1a(params):
     Expects:
       {
         "start": 1,
-        "end": 10
+        "end": 10,
+        "show": "full"
       }
+    "show" controls how each factorial is streamed: "full" (all digits),
+    "digits" (digit count only) or "hash" (digit count + sha256 prefix).
     Streams progress and results continuously without waiting for input.
     """
 
     try:
         start = int(params.get("start", 1))
         end = int(params.get("end", 500))
+        show = str(params.get("show", "full")).lower()
+        if show not in ("full", "digits", "hash"):
+            raise ValueError(f"Unknown show option '{show}' (choose full, digits or hash)")
 
         yield flush_line(f"Starting Harshad factorial check for range [{start}, {end}]...")
 
@@ -46,9 +112,12 @@ def stream_s2_1a(params):
         first = start
 
         while True:
-            yield flush_line(f"Checking {start}! = {f} ...")
+            s, value = describe_value(f, show)
+            yield flush_line(f"Checking {start}! = {value} ...")
 
-            is_harshad = Check_Harshad(f)
+            is_harshad = s != 0 and f % s == 0
+            if end >= first:  # an empty or reversed range has no meaningful fraction
+                yield progress((start - first + 1) / (end - first + 1))
 
             if is_harshad:
                 yield flush_line(f"{start}! is a Harshad number ✅")
@@ -59,7 +128,7 @@ def stream_s2_1a(params):
                     return
                 f *= start
             else:
-                yield flush_line(f"{start}! = {f}")
+                yield flush_line(f"{start}! = {value}")
                 yield flush_line(f"{start}! is NOT a Harshad number ❌")
                 yield flush_line("---END---")
                 return
@@ -1,13 +1,19 @@
 # app/solutions/s2_1b_stream.py
-import sys
+import math
+import time
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import reduce
+import numpy as np
+from app.solutions.events import progress
 
 # ============================================================
 # Helper functions
 # ============================================================
 
 def flush_line(line: str):
-    """Force immediate flush of a line."""
-    sys.stdout.flush()
+    """Terminate a line for streaming (make_stream_response batches the writes)."""
     return f"{line.rstrip()}\n"
 
 def Check_Harshad(f: int) -> bool:
@@ -17,6 +23,436 @@ def Check_Harshad(f: int) -> bool:
         return False
     return f % s == 0
 
+_DIGIT_SUM_TABLE = np.array([sum(int(d) for d in str(i)) for i in range(10000)], dtype=np.int64)
+INT64_SAFE = 2**62
+
+def digit_sums_array(N):
+    """Digit sums of a non-negative int64 array, four digits at a time."""
+    N = N.copy()
+    s = np.zeros_like(N)
+    while N.any():
+        s += _DIGIT_SUM_TABLE[N % 10000]
+        N //= 10000
+    return s
+
+class DigitSumCounter:
+    """Counter whose digit sum is updated incrementally (carry-aware, O(1) amortized)."""
+
+    def __init__(self, value: int):
+        self.value = value
+        self.digits = [int(d) for d in reversed(str(value))]  # least significant first
+        self.digit_sum = sum(self.digits)
+
+    def increment(self):
+        digits = self.digits
+        k = 0
+        while k < len(digits) and digits[k] == 9:
+            digits[k] = 0
+            k += 1
+        if k == len(digits):
+            digits.append(1)
+        else:
+            digits[k] += 1
+        self.digit_sum += 1 - 9 * k
+        self.value += 1
+
+def iter_digit_sums(start: int):
+    """Yield (i, digit_sum(i)) for i = start, start+1, ..."""
+    counter = DigitSumCounter(start)
+    while True:
+        yield counter.value, counter.digit_sum
+        counter.increment()
+
+
+# ============================================================
+# Linear scan engines
+# ============================================================
+# Each engine returns mask(lo, hi): a boolean array telling which of
+# lo..hi-1 are Harshad. Calls must cover consecutive ranges in order.
+
+SCAN_BLOCK = 1 << 20
+
+def numpy_mask_engine(start: int):
+    def mask(lo, hi):
+        N = np.arange(lo, hi, dtype=np.int64)
+        ds = digit_sums_array(N)
+        return (ds > 0) & (N % np.maximum(ds, 1) == 0)
+    return mask
+
+def incremental_mask_engine(start: int):
+    sums = iter_digit_sums(start)
+    def mask(lo, hi):
+        out = np.empty(hi - lo, dtype=bool)
+        for k in range(hi - lo):
+            i, ds = next(sums)
+            out[k] = ds > 0 and i % ds == 0
+        return out
+    return mask
+
+def string_mask_engine(start: int):
+    def mask(lo, hi):
+        return np.fromiter((Check_Harshad(i) for i in range(lo, hi)), dtype=bool, count=hi - lo)
+    return mask
+
+MASK_ENGINES = {
+    "numpy": numpy_mask_engine,
+    "incremental": incremental_mask_engine,
+    "string": string_mask_engine,
+}
+
+def iter_streaks(mask, lo, hi, min_length, block_stop):
+    """
+    Walk lo..hi block by block. Yields ("block", i) before each block and
+    ("run", first, last) for every maximal Harshad streak that is at least
+    min_length long or touches lo or hi. Streaks crossing block edges are
+    merged; block_stop(i) is the (exclusive) end of the block starting at i.
+    """
+    i = lo
+    curr = 0  # streak length ending at i - 1
+    while i <= hi:
+        yield ("block", i)
+        stop = block_stop(i)
+        m = mask(i, stop)
+        n = stop - i
+
+        if curr and not m[0]:
+            if curr >= min_length or i - curr == lo:
+                yield ("run", i - curr, i - 1)
+            curr = 0
+
+        edges = np.diff(np.concatenate(([0], m.view(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1)
+        if len(starts):
+            lengths = stops - starts
+            if starts[0] == 0:
+                lengths[0] += curr
+            firsts = i + stops - lengths
+            pending = stops[-1] == n
+            closed = len(starts) - 1 if pending else len(starts)
+            keep = (lengths[:closed] >= min_length) | (firsts[:closed] == lo)
+            for r in np.flatnonzero(keep):
+                yield ("run", int(firsts[r]), i + int(stops[r]) - 1)
+            curr = int(lengths[-1]) if pending else 0
+        i = stop
+
+    if curr:
+        yield ("run", hi - curr + 1, hi)
+
+def longer_streak_lines(limit):
+    """Lines streamed for a streak that reaches `limit` but keeps going."""
+    return [
+        f"\n{limit} consecutive Harshad numbers found!\n",
+        f"Found more than {limit} consecutive — continuing search...\n",
+    ]
+
+def resolve_engine(engine, hi):
+    return "incremental" if engine == "numpy" and hi + 1 >= INT64_SAFE else engine
+
+def stream_linear(start, end, limit, update, engine):
+    """
+    Scan [start, end] block by block for a streak of exactly `limit`
+    Harshad numbers (a streak bounded by non-Harshad numbers or `start`).
+    """
+    engine = resolve_engine(engine, end)
+    mask = MASK_ENGINES[engine](start)
+    yield flush_line(f"Engine: {engine}")
+
+    def report(length, last, next_is_harshad):
+        # Mirrors the streak checks of the original scalar scan
+        if length == limit and not next_is_harshad:
+            lines = [f"\n{limit} consecutive Harshad numbers found!\n", "Numbers are:\n"]
+            lines.extend(f"{last - limit + 1 + j}\n" for j in range(limit))
+            return lines, True
+        return longer_streak_lines(limit), False
+
+    # The numpy engine scans SCAN_BLOCK numbers at a time whatever the report
+    # cadence and then emits every "Checking between" line the block
+    # covered; the pure-Python engines stop at each report boundary so
+    # their lines stay live.
+    scan_block = SCAN_BLOCK if engine == "numpy" else None
+
+    def block_stop(i):
+        if scan_block:
+            return min(end + 1, i + scan_block)
+        return min(end + 1, start + ((i - start) // update + 1) * update)
+
+    t0 = time.time()
+    next_report = start  # first report boundary not yet announced
+
+    def reports_through(i):
+        """Progress lines for the report boundaries up to i, in order."""
+        nonlocal next_report
+        lines = []
+        elapsed = time.time() - t0
+        while next_report <= min(i, end):
+            rate = (next_report - start) / elapsed if elapsed > 0 else 0.0
+            lines.append(flush_line(
+                f"Checking between {next_report} and {min(next_report + update - 1, end)} ... [{rate / 1e6:.2f}M numbers/s]\n"))
+            next_report += update
+        if lines:
+            lines.append(progress((next_report - update - start) / (end - start + 1)))
+        return lines
+
+    for event in iter_streaks(mask, start, end, limit, block_stop):
+        if event[0] == "block":
+            # The previous block is scanned: announce the boundaries it covered
+            yield from reports_through(event[1] - 1)
+            continue
+
+        _, first, last = event
+        length = last - first + 1
+        if length < limit:
+            continue
+        # The original scan decided at first + limit - 1, after that window's line
+        yield from reports_through(first + limit - 1)
+        next_is_harshad = last == end and Check_Harshad(end + 1)
+        lines, done = report(length, last, next_is_harshad)
+        for line in lines:
+            yield flush_line(line)
+        if done:
+            yield flush_line("---END---")
+            return
+
+    yield from reports_through(end)
+    elapsed = time.time() - t0
+    yield flush_line(f"Scanned {end - start + 1} numbers in {elapsed:.2f}s")
+    yield flush_line(f"\nDid not find exactly {limit} consecutive Harshad numbers in range [{start}, {end}].\n")
+    yield flush_line("---END---")
+
+
+# ============================================================
+# Range-sharded parallel scan (params.workers > 1)
+# ============================================================
+# Each shard is summarised independently in a worker process: the streak
+# touching its left edge (prefix), the one touching its right edge
+# (suffix), its first interior streak of exactly `limit` and how many
+# interior streaks longer than `limit` come before it. Summaries are
+# stitched in range order, so streaks spanning shard edges are found and
+# the "continuing search" lines match the linear scan.
+
+SHARD_MAX = 1 << 26
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+def scan_shard(lo, hi, limit, engine="numpy"):
+    """Summarise the Harshad streaks of lo..hi for stitching with its neighbours."""
+    mask = MASK_ENGINES[resolve_engine(engine, hi)](lo)
+    summary = {"lo": lo, "hi": hi, "prefix": 0, "suffix": 0, "exact": None, "longer": 0}
+    for event in iter_streaks(mask, lo, hi, limit, lambda i: min(hi + 1, i + SCAN_BLOCK)):
+        if event[0] != "run":
+            continue
+        _, first, last = event
+        if first == lo:
+            summary["prefix"] = last - first + 1
+        if last == hi:
+            summary["suffix"] = last - first + 1
+        elif first != lo and last - first + 1 == limit:
+            summary["exact"] = first
+            break
+        elif first != lo and last - first + 1 > limit:
+            summary["longer"] += 1
+    return summary
+
+def stitch_shard(summary, carry, limit):
+    """
+    Combine a shard summary with the streak carried in from the left.
+    Returns (first number of an exact streak or None, new carry, number of
+    streaks longer than limit closed before it).
+    """
+    n = summary["hi"] - summary["lo"] + 1
+    if summary["prefix"] == n:
+        return None, carry + n, 0
+    joined = carry + summary["prefix"]  # the streak ending at this shard's first non-Harshad number
+    if joined == limit:
+        return summary["lo"] + summary["prefix"] - limit, 0, 0
+    longer = summary["longer"] + (joined > limit)
+    if summary["exact"] is not None:
+        return summary["exact"], 0, longer
+    return None, summary["suffix"], longer
+
+def stream_parallel(start, end, limit, workers, engine):
+    total = end - start + 1
+    shard_size = min(SHARD_MAX, max(SCAN_BLOCK, -(-total // (workers * 4))))
+    shards = [(lo, min(lo + shard_size - 1, end)) for lo in range(start, end + 1, shard_size)]
+    yield flush_line(f"Parallel scan: {len(shards)} shard(s) of up to {shard_size} numbers on {workers} worker processes")
+
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(method))
+    t0 = time.time()
+    in_flight = {}
+    results = {}
+    next_submit = 0
+    next_stitch = 0
+    scanned = 0
+    carry = 0
+    found = None
+    try:
+        while next_stitch < len(shards) and found is None:
+            while next_submit < len(shards) and len(in_flight) < workers * SHARDS_IN_FLIGHT_PER_WORKER:
+                lo, hi = shards[next_submit]
+                in_flight[pool.submit(scan_shard, lo, hi, limit, engine)] = next_submit
+                next_submit += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                k = in_flight.pop(fut)
+                results[k] = fut.result()
+                lo, hi = shards[k]
+                scanned += hi - lo + 1
+                elapsed = time.time() - t0
+                rate = scanned / elapsed if elapsed > 0 else 0.0
+                yield flush_line(f"Shard {k + 1}/{len(shards)} [{lo}, {hi}] done ... [{rate / 1e6:.2f}M numbers/s]")
+                yield progress(scanned / total)
+
+            while next_stitch in results and found is None:
+                found, carry, longer = stitch_shard(results.pop(next_stitch), carry, limit)
+                next_stitch += 1
+                for _ in range(longer):
+                    for line in longer_streak_lines(limit):
+                        yield flush_line(line)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if found is None and carry >= limit:
+        # The streak touching `end`, judged by the number after it as in the linear scan
+        if carry == limit and not Check_Harshad(end + 1):
+            found = end - limit + 1
+        else:
+            for line in longer_streak_lines(limit):
+                yield flush_line(line)
+
+    yield flush_line(f"Scanned {scanned} numbers in {time.time() - t0:.2f}s")
+    if found is None:
+        yield flush_line(f"\nDid not find exactly {limit} consecutive Harshad numbers in range [{start}, {end}].\n")
+    else:
+        yield flush_line(f"\n{limit} consecutive Harshad numbers found!\n")
+        yield flush_line(f"Numbers are:\n")
+        for j in range(limit):
+            yield flush_line(f"{found + j}\n")
+    yield flush_line("---END---")
+
+
+# ============================================================
+# LCM sieve (mode="sieve")
+# ============================================================
+# If N, N+1, ..., N+C-1 are Harshad with digit sums S, S+1, ..., S+C-1,
+# then N - S is divisible by lcm(9, S, ..., S+C-1) = L, i.e. N = k*L + S.
+# For each digit sum S only that residue class has to be searched. Large
+# L are scanned directly over k; small L (huge k ranges) are enumerated
+# with a digit DP over (digits left, digit sum left, N mod L).
+# Runs whose digit sums are not consecutive (a carry inside the run) are
+# not produced by this mode.
+
+DP_MAX_STATES = 40_000_000   # bound on the DP table (bytes), per digit sum
+DP_STATE_COST = 0.1          # a DP state is ~10x cheaper than scanning one k
+SCAN_CHUNK = 1 << 20
+
+def lcm_list(numbers):
+    return reduce(lambda a, b: a * b // math.gcd(a, b), numbers)
+
+def _scan_residue_class(S, L, start, end):
+    """Numbers N = k*L + S in [start, end] with digit sum S, by direct scan over k."""
+    first = S if S >= start else S + -(-(start - S) // L) * L
+    if end < 2**62:
+        for base in range(first, end + 1, L * SCAN_CHUNK):
+            count = min(SCAN_CHUNK, (end - base) // L + 1)
+            N = base + L * np.arange(count, dtype=np.int64)
+            for n in N[digit_sums_array(N) == S]:
+                yield int(n)
+    else:
+        for n in range(first, end + 1, L):
+            if sum(int(d) for d in str(n)) == S:
+                yield n
+
+def _dp_residue_class(S, L, start, end):
+    """Same set as _scan_residue_class, enumerated in order with a digit DP."""
+    num_digits = len(str(end))
+    target = S % L
+    pow10 = [pow(10, m, L) for m in range(num_digits + 1)]
+
+    # R[m, t, x]: some m-digit tail has digit sum t and value ≡ x (mod L)
+    R = np.zeros((num_digits + 1, S + 1, L), dtype=bool)
+    R[0, 0, 0] = True
+    for m in range(1, num_digits + 1):
+        for t in range(S + 1):
+            for d in range(min(9, t) + 1):
+                prev = R[m - 1, t - d]
+                if prev.any():
+                    R[m, t] |= np.roll(prev, (d * pow10[m - 1]) % L)
+
+    def feasible(m, t, r):
+        return 0 <= t <= 9 * m and R[m, t, (target - r * pow10[m]) % L]
+
+    def dfs(value, m, t, r):
+        if m == 0:
+            yield value
+            return
+        for d in range(min(9, t) + 1):
+            r2 = (r * 10 + d) % L
+            if feasible(m - 1, t - d, r2):
+                yield from dfs(value * 10 + d, m - 1, t - d, r2)
+
+    if feasible(num_digits, S, 0):
+        for n in dfs(0, num_digits, S, 0):
+            if n > end:
+                return
+            if n >= start:
+                yield n
+
+def sieve_candidates(S, count, start, end):
+    """Return (L, method, iterator over candidate N) for one digit sum S."""
+    L = lcm_list([9] + list(range(S, S + count)))
+    k_count = max(0, (end - S) // L + 1)
+    dp_states = (len(str(end)) + 1) * (S + 1) * L
+    if dp_states <= DP_MAX_STATES and dp_states * DP_STATE_COST < k_count:
+        return L, "digit-DP", _dp_residue_class(S, L, start, end)
+    return L, "scan", _scan_residue_class(S, L, start, end)
+
+def is_exact_run(N, count, start):
+    """N..N+count-1 Harshad, bounded by non-Harshad numbers (or the range start)."""
+    if not all(Check_Harshad(N + j) for j in range(count)):
+        return False
+    if Check_Harshad(N + count):
+        return False
+    return N == start or not Check_Harshad(N - 1)
+
+def stream_sieve(start, end, limit, params):
+    S_min = max(1, int(params.get("digit_sum_start", 1)))
+    S_max = int(params.get("digit_sum_end", 9 * len(str(end))))
+    max_results = int(params.get("max_results", 1))
+
+    yield flush_line(f"Sieve mode: N = k·lcm(9, S..S+{limit - 1}) + S for digit sums S = {S_min}..{S_max}")
+    t0 = time.time()
+    found = []
+    for S in range(S_min, S_max + 1):
+        L, method, candidates = sieve_candidates(S, limit, start, end)
+        tested = 0
+        hits = []
+        for N in candidates:
+            tested += 1
+            if is_exact_run(N, limit, start):
+                hits.append(N)
+        found.extend(hits)
+        yield flush_line(
+            f"S={S}: L={L} ({method}), {tested} candidates with digit sum {S}, {len(hits)} run(s)"
+            + (f" starting at {', '.join(map(str, hits[:5]))}" if hits else "")
+        )
+        yield progress((S - S_min + 1) / (S_max - S_min + 1), f"digit sum {S}")
+
+    yield flush_line(f"Sieve finished in {time.time() - t0:.2f}s")
+    if not found:
+        yield flush_line(f"\nDid not find exactly {limit} consecutive Harshad numbers in range [{start}, {end}] with consecutive digit sums.\n")
+        yield flush_line("---END---")
+        return
+
+    found.sort()
+    yield flush_line(f"\n{limit} consecutive Harshad numbers found!\n")
+    for N in found[:max_results]:
+        yield flush_line(f"Numbers are:\n")
+        for j in range(limit):
+            yield flush_line(f"{N + j}\n")
+    yield flush_line("---END---")
+
 
 def stream_s2_1b(params: dict):
     """
@@ -26,52 +462,40 @@ def stream_s2_1b(params: dict):
         "start": 1,
         "end": 1000,
         "limit": 5,
-        "update": 100
+        "update": 100,
+        "mode": "linear"
     }
+    Linear scans use "engine": "numpy" (default, block-vectorized),
+    "incremental" (carry-aware digit sums) or "string", and with
+    "workers" > 1 (0 = all cores) the range is sharded over processes.
+    mode "sieve" uses the LCM digit-sum sieve instead of a linear scan
+    (optional "digit_sum_start", "digit_sum_end", "max_results").
     """
     try:
         start = int(params.get("start", "1"))
         end = int(params.get("end", "1000"))
         limit = int(params.get("limit", "5"))
         update = int(params.get("update", "100"))
+        mode = str(params.get("mode", "linear")).lower()
+        engine = str(params.get("engine", "numpy")).lower()
+        if engine not in MASK_ENGINES:
+            raise ValueError(f"Unknown engine '{engine}' (choose from {', '.join(MASK_ENGINES)})")
+        if update < 1:
+            raise ValueError(f"update must be at least 1 (got {update})")
 
         yield flush_line(f"Searching for {limit} consecutive Harshad numbers in range [{start}, {end}]...\n")
 
-        i = start
-        curr = 0
-
-        # initial update message
-        yield flush_line(f"Checking between {i} and {min(i + update - 1, end)} ...\n")
-
-        while True:
-            if (i - start) % update == 0:
-                yield flush_line(f"Checking between {i} and {min(i + update - 1, end)} ...\n")
-
-            if Check_Harshad(i):
-                curr += 1
-                # yield flush_line(f"{i} is a Harshad number (current streak = {curr})\n"
-            else:
-                # if curr > 0:
-                #     yield flush_line(f"{i} breaks the streak (was {curr} long)\n"
-                curr = 0
-
-            if curr == limit:
-                yield flush_line(f"\n{limit} consecutive Harshad numbers found!\n")
-                if not Check_Harshad(i + 1):
-                    yield flush_line(f"Numbers are:\n")
-                    for j in range(limit):
-                        yield flush_line(f"{i + j - limit + 1}\n")
-                    yield flush_line("---END---")
-                    return
-                else:
-                    yield flush_line(f"Found more than {limit} consecutive — continuing search...\n")
-
-            i += 1
-            if i > end:
-                yield flush_line(f"\nDid not find exactly {limit} consecutive Harshad numbers in range [{start}, {end}].\n")
-                yield flush_line("---END---")
-                return
+        if mode == "sieve":
+            yield from stream_sieve(start, end, limit, params)
+            return
 
+        workers = int(params.get("workers", 1))
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        if workers > 1:
+            yield from stream_parallel(start, end, limit, workers, engine)
+        else:
+            yield from stream_linear(start, end, limit, update, engine)
 
     except Exception as e:
         yield flush_line(f"Error: {str(e)}\n")
@@ -1,11 +1,13 @@
 # app/solutions/s2_2.py
 import numpy as np
-import csv
-import sys
 import time
 from numpy.polynomial import polynomial as P_mod
 from numpy.polynomial import legendre as L
 import os
+from scipy.linalg import solve_triangular, eigh_tridiagonal
+from app.solutions.gauss_legendre import cached_gauss_legendre
+from app.solutions.artifacts import ArtifactWriters
+from app.solutions.events import progress
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output", "2_2")
@@ -16,94 +18,367 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ============================================================
 
 def flush_line(line: str):
-    """Force immediate flush of a line for real-time streaming."""
-    sys.stdout.flush()
+    """Terminate a line for streaming (make_stream_response batches the writes)."""
     return f"{line.rstrip()}\n"
 
-def build_legendre_tridiagonal(n):
-    yield flush_line(f"Building {n}x{n} symmetric tridiagonal matrix for root finding...")
+def legendre_jacobi(n):
+    """Diagonal and off-diagonal of the n x n Legendre Jacobi matrix (O(n) memory)."""
     n_range = np.arange(1.0, n)
     beta = n_range / np.sqrt(4 * n_range**2 - 1)
-    J = np.zeros((n, n))
-    np.fill_diagonal(J[1:, :], beta)
-    np.fill_diagonal(J[:, 1:], beta)
+    return np.zeros(n), beta
+
+def build_legendre_tridiagonal(n):
+    yield flush_line(f"Building {n}x{n} symmetric tridiagonal matrix for root finding...")
+    d, e = legendre_jacobi(n)
     yield flush_line("Tridiagonal matrix constructed successfully.")
-    return J
-
-def lu_decomposition_fast(A):
-    A = A.copy()
-    n = A.shape[0]
-    L = np.eye(n)
-    P = np.eye(n)
-    for k in range(n - 1):
-        pivot = np.argmax(np.abs(A[k:, k])) + k
-        if A[pivot, k] == 0:
-            raise ValueError("Singular matrix detected.")
-        if pivot != k:
-            A[[k, pivot]] = A[[pivot, k]]
-            P[[k, pivot]] = P[[pivot, k]]
-            if k > 0:
-                L[[k, pivot], :k] = L[[pivot, k], :k]
-        L[k+1:, k] = A[k+1:, k] / A[k, k]
-        A[k+1:, k:] -= np.outer(L[k+1:, k], A[k, k:])
-    U = np.triu(A)
-    return P, L, U
-
-def forward_substitution_fast(L, b):
-    n = L.shape[0]
-    y = np.zeros(n, dtype=float)
-    for i in range(n):
-        y[i] = b[i] - np.dot(L[i, :i], y[:i])
-    return y
-
-def backward_substitution_fast(U, y):
-    n = U.shape[0]
-    x = np.zeros(n, dtype=float)
-    for i in range(n - 1, -1, -1):
-        x[i] = (y[i] - np.dot(U[i, i+1:], x[i+1:])) / U[i, i]
-    return x
+    return d, e
+
+TRIDIAGONAL_CHUNK = 4096  # eigenvalues per chunk in tridiagonal_first_components
+
+def tridiagonal_first_components(d, e, eigenvalues, chunk=TRIDIAGONAL_CHUNK):
+    """
+    First components of the normalised eigenvectors of tridiagonal (d, e).
+    The eigenvector for λ is proportional to the orthonormal polynomials
+    p_j(λ) of the three-term recurrence, with p_0 = 1, so v_0 = 1/||p(λ)||.
+    Runs over chunks of eigenvalues, keeping memory O(n + chunk).
+    """
+    n = len(d)
+    eigenvalues = np.asarray(eigenvalues, dtype=float)
+    v0 = np.empty_like(eigenvalues)
+    for s in range(0, len(eigenvalues), chunk):
+        lam = eigenvalues[s:s + chunk]
+        p_prev = np.zeros_like(lam)
+        p = np.ones_like(lam)
+        norm2 = np.ones_like(lam)
+        for j in range(n - 1):
+            p_prev, p = p, ((lam - d[j]) * p - (e[j - 1] if j else 0.0) * p_prev) / e[j]
+            norm2 += p * p
+        v0[s:s + chunk] = 1.0 / np.sqrt(norm2)
+    return v0
+
+def golub_welsch(d, e, weights=False, mu0=2.0):
+    """
+    Eigenvalues (ascending) of the symmetric tridiagonal Jacobi matrix
+    (d, e) via LAPACK; with weights=True also the Gauss weights
+    mu0 * v_0^2 from the first eigenvector components.
+    """
+    x = eigh_tridiagonal(d, e, eigvals_only=True, check_finite=False)
+    if not weights:
+        return x
+    return x, mu0 * tridiagonal_first_components(d, e, x) ** 2
+
+# ============================================================
+# Blocked LU factorization (pivots kept as an index vector)
+# ============================================================
+
+LU_BLOCK = 64
+
+def lu_factor(A, block=LU_BLOCK, overwrite=False):
+    """
+    Right-looking blocked LU with partial pivoting, in place.
+    Returns (LU, perm): unit-lower L strictly below the diagonal and U on
+    and above it in one array, with A[perm] = L @ U. Each block of columns
+    is factorised as a narrow panel; the trailing matrix is then updated
+    with one triangular solve and one matrix product (BLAS-3).
+    """
+    LU = A if overwrite else np.array(A, dtype=float)
+    n = LU.shape[0]
+    perm = np.arange(n)
+    for j0 in range(0, n, block):
+        j1 = min(j0 + block, n)
+        for k in range(j0, j1):
+            pivot = np.argmax(np.abs(LU[k:, k])) + k
+            if LU[pivot, k] == 0:
+                raise ValueError("Singular matrix detected.")
+            if pivot != k:
+                LU[[k, pivot]] = LU[[pivot, k]]
+                perm[[k, pivot]] = perm[[pivot, k]]
+            LU[k+1:, k] /= LU[k, k]
+            LU[k+1:, k+1:j1] -= LU[k+1:, k, None] * LU[k, None, k+1:j1]
+        if j1 < n:
+            LU[j0:j1, j1:] = solve_triangular(LU[j0:j1, j0:j1], LU[j0:j1, j1:], lower=True,
+                                              unit_diagonal=True, check_finite=False)
+            LU[j1:, j1:] -= LU[j1:, j0:j1] @ LU[j0:j1, j1:]
+    return LU, perm
+
+def lu_solve(factors, B):
+    """Solve A X = B from lu_factor(A); B may be a vector or an (n, k) matrix."""
+    LU, perm = factors
+    Y = solve_triangular(LU, np.asarray(B, dtype=float)[perm], lower=True,
+                         unit_diagonal=True, check_finite=False)
+    return solve_triangular(LU, Y, lower=False, check_finite=False)
+
+class LUFactorization:
+    """Factor A once; solve(B) then reuses the factors for any number of right-hand sides."""
+
+    def __init__(self, A, block=LU_BLOCK):
+        self.n = A.shape[0]
+        self.factors = lu_factor(A, block)
+        self.solved = 0  # right-hand sides solved so far
+
+    def solve(self, B):
+        B = np.asarray(B, dtype=float)
+        if B.shape[0] != self.n:
+            raise ValueError(f"Right-hand side has {B.shape[0]} rows, expected {self.n}")
+        self.solved += 1 if B.ndim == 1 else B.shape[1]
+        return lu_solve(self.factors, B)
 
 def solve_lu_fast(A, b):
-    P, L, U = lu_decomposition_fast(A)
-    Pb = P @ b
-    y = forward_substitution_fast(L, Pb)
-    x = backward_substitution_fast(U, y)
-    return x
-
-def newton_raphson(f, f_prime, x0, tol=1e-12, max_iter=100):
-    x = x0
-    for i in range(max_iter):
-        fx = f(x)
-        if abs(fx) < tol:
-            return x
-        fpx = f_prime(x)
-        if fpx == 0:
-            return None
-        x_new = x - fx / fpx
-        if abs(x_new - x) < tol:
-            return x_new
-        x = x_new
+    return LUFactorization(A).solve(b)
+
+def parse_rhs(params, n):
+    """
+    Extra right-hand sides for the LU solve as an (n, k) matrix, or None.
+    "rhs" is one vector or a list of vectors (lists, or a string with
+    vectors separated by ';' and entries by ','); "rhs_batch": k generates
+    k random vectors (seeded by "rhs_seed").
+    """
+    rhs = params.get("rhs")
+    if rhs is not None and rhs != "":
+        if isinstance(rhs, str):
+            rhs = [[float(v) for v in row.split(",")] for row in rhs.split(";") if row.strip()]
+        B = np.asarray(rhs, dtype=float)
+        B = B.reshape(1, -1) if B.ndim == 1 else B
+        if B.ndim != 2 or B.shape[1] != n:
+            raise ValueError(f"Each right-hand side must have {n} entries")
+        return B.T
+    batch = int(params.get("rhs_batch", 0))
+    if batch > 0:
+        rng = np.random.default_rng(int(params.get("rhs_seed", 0)))
+        return rng.standard_normal((n, batch))
     return None
 
+# ============================================================
+# Vectorized Newton–Raphson on all Legendre roots
+# ============================================================
+
+def legendre_eval(n, x):
+    """P_n(x) and P_n'(x) on an array x via the three-term recurrence."""
+    x = np.asarray(x, dtype=float)
+    p_prev, p = np.ones_like(x), x.copy()
+    if n == 0:
+        return p_prev, np.zeros_like(x)
+    for k in range(2, n + 1):
+        p_prev, p = p, ((2 * k - 1) * x * p - (k - 1) * p_prev) / k
+    denom = x * x - 1.0
+    edge = np.abs(denom) < 1e-14
+    dp = n * (x * p - p_prev) / np.where(edge, 1.0, denom)
+    # P_n'(±1) = (±1)^(n-1) n (n+1) / 2
+    dp = np.where(edge, np.sign(x) ** (n - 1) * n * (n + 1) / 2.0, dp)
+    return p, dp
+
+def legendre_initial_guesses(n):
+    """Tricomi's asymptotic approximations of the roots of P_n, ascending."""
+    k = np.arange(n, 0, -1)
+    theta = np.pi * (4 * k - 1) / (4 * n + 2)
+    return (1 - 1 / (8.0 * n**2) + 1 / (8.0 * n**3)) * np.cos(theta)
+
+def newton_legendre_roots(n, x0=None, tol=1e-15, max_iter=100):
+    """
+    Refine approximations x0 (default: Tricomi guesses) of the roots of P_n
+    all at once. Only unconverged roots are re-evaluated each sweep.
+    Returns (roots, iterations per root, converged mask).
+    """
+    x = legendre_initial_guesses(n) if x0 is None else np.array(x0, dtype=float)
+    iterations = np.zeros(x.shape, dtype=int)
+    active = np.ones(x.shape, dtype=bool)
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if not len(idx):
+            break
+        p, dp = legendre_eval(n, x[idx])
+        ok = dp != 0
+        step = np.where(ok, p / np.where(ok, dp, 1.0), 0.0)
+        x[idx] -= step
+        iterations[idx] += 1
+        active[idx[~ok | (np.abs(step) <= tol * np.maximum(1.0, np.abs(x[idx])))]] = False
+    converged = ~active
+    p, _ = legendre_eval(n, x)
+    converged &= np.isfinite(p)
+    return x, iterations, converged
+
+
+# ============================================================
+# Sturm-sequence bisection (symmetric tridiagonal eigenvalues)
+# ============================================================
+
+def sturm_count(d, e, x):
+    """
+    Number of eigenvalues of the symmetric tridiagonal matrix (d, e) below
+    each shift in x, from the signs of the LDL^T pivots of T - xI.
+    Vectorized over x: O(n) work per shift.
+    """
+    x = np.asarray(x, dtype=float)
+    e2 = np.asarray(e, dtype=float) ** 2
+    pivmin = np.finfo(float).tiny * max(1.0, e2.max(initial=0.0))
+    q = d[0] - x
+    q = np.where(np.abs(q) <= pivmin, -pivmin, q)
+    count = (q < 0).astype(int)
+    for i in range(1, len(d)):
+        q = d[i] - x - e2[i - 1] / q
+        q = np.where(np.abs(q) <= pivmin, -pivmin, q)
+        count += q < 0
+    return count
+
+def sturm_bisection(d, e, tol=None, max_iter=200):
+    """
+    All eigenvalues of the symmetric tridiagonal matrix (d, e), ascending.
+    Every eigenvalue keeps its own Gershgorin-initialised bracket, so close
+    roots are never missed. Returns (eigenvalues, bisection steps).
+    """
+    d = np.asarray(d, dtype=float)
+    e = np.asarray(e, dtype=float)
+    n = len(d)
+    radius = np.abs(np.concatenate(([0.0], e))) + np.abs(np.concatenate((e, [0.0])))
+    lo = np.full(n, np.min(d - radius))
+    hi = np.full(n, np.max(d + radius))
+    if tol is None:
+        tol = 4 * np.finfo(float).eps * max(np.abs(lo[0]), np.abs(hi[0]), 1.0)
+    k = np.arange(n)
+    steps = 0
+    while steps < max_iter and np.max(hi - lo) > tol:
+        mid = 0.5 * (lo + hi)
+        below = sturm_count(d, e, mid) > k  # eigenvalue k lies below mid
+        hi = np.where(below, mid, hi)
+        lo = np.where(below, lo, mid)
+        steps += 1
+    return 0.5 * (lo + hi), steps
+
+# ============================================================
+# Batched determinant scan (eig_method="lu_scan")
+# ============================================================
+
+DET_BATCH_BYTES = 64 * 1024 * 1024  # cap on the stacked (batch, n, n) shifts
+
+def shifted_slogdets(C, lambdas):
+    """
+    sign and log|det| of C - λI for every λ. The shifted matrices are
+    stacked into (batch, n, n) arrays and handed to one slogdet call per
+    batch, so nothing is factorised in Python and large n cannot overflow.
+    """
+    C = np.asarray(C, dtype=float)
+    lambdas = np.asarray(lambdas, dtype=float)
+    n = C.shape[0]
+    batch = max(1, DET_BATCH_BYTES // (8 * n * n))
+    diag = np.arange(n)
+    signs = np.empty(len(lambdas))
+    logdets = np.empty(len(lambdas))
+    for s in range(0, len(lambdas), batch):
+        lam = lambdas[s:s + batch]
+        stack = np.repeat(C[None, :, :], len(lam), axis=0)
+        stack[:, diag, diag] -= lam[:, None]
+        signs[s:s + batch], logdets[s:s + batch] = np.linalg.slogdet(stack)
+    return signs, logdets
+
+def eigenvalues_via_det_scan(C, search_min=-2, search_max=2, steps=200, max_steps=6400, tol=1e-12, max_refine=100):
+    """
+    Real eigenvalues of C from sign changes of det(C - λI) on [search_min, search_max].
+    The coarse grid is doubled until n sign changes are seen (or max_steps),
+    then every bracket is bisected simultaneously. Returns (eigenvalues, samples).
+    """
+    n = C.shape[0]
+    samples = 0
+    while True:
+        lambdas = np.linspace(search_min, search_max, steps)
+        signs, _ = shifted_slogdets(C, lambdas)
+        samples += steps
+        exact = lambdas[signs == 0]
+        change = np.flatnonzero(signs[:-1] * signs[1:] < 0)
+        if len(change) + len(exact) >= n or steps * 2 > max_steps:
+            break
+        steps *= 2
+
+    lo = lambdas[change]
+    hi = lambdas[change + 1]
+    sign_lo = signs[change]
+    for _ in range(max_refine):
+        if not len(lo) or np.max(hi - lo) <= tol:
+            break
+        mid = 0.5 * (lo + hi)
+        sign_mid, _ = shifted_slogdets(C, mid)
+        samples += len(mid)
+        same = sign_mid == sign_lo
+        hit = sign_mid == 0
+        lo = np.where(same | hit, mid, lo)
+        hi = np.where(same, hi, mid)
+    return np.sort(np.concatenate((exact, 0.5 * (lo + hi)))), samples
+
+EIG_METHODS = ("sturm", "lu_scan")
+
+# ============================================================
+# Large-n mode
+# ============================================================
+# Past a few hundred the power-basis coefficients and the companion matrix
+# are numerically meaningless (and an n x n CSV), and the O(n^2) root
+# checks dominate. Large-n runs skip them and take roots and weights from
+# the O(n) asymptotic Gauss-Legendre rule instead.
+
+LARGE_N_AUTO = 2000  # "large_n": "auto" switches mode above this degree
+
+def use_large_n_mode(params, n):
+    mode = str(params.get("large_n", "auto")).lower()
+    if mode == "auto":
+        return n > LARGE_N_AUTO
+    return mode in ("1", "true", "yes", "on")
+
+def stream_large_n(n, output_dir, artifacts):
+    yield flush_line(f"Large-n mode: skipping power-basis coefficients, companion matrix and LU stages "
+                     f"(pass large_n=false to force them).")
+    yield flush_line(f"Calculating {n} roots and weights from the asymptotic Gauss-Legendre expansions...")
+    start_time = time.time()
+    shifted_roots, shifted_weights = cached_gauss_legendre(n, (0.0, 1.0))
+    yield flush_line(f"Roots and weights computed in {time.time() - start_time:.4f}s "
+                     f"(sum of weights - 1 = {shifted_weights.sum() - 1.0:.3e})")
+    yield progress(0.5, "roots")
+
+    ROOTS_FILE = os.path.join(output_dir, "legendre_roots.csv")
+    artifacts.save(ROOTS_FILE, np.column_stack((shifted_roots, shifted_weights)), header="root,weight", npy=True)
+    yield flush_line(f"Roots and weights saved to {ROOTS_FILE}")
+
+    yield flush_line("\n--- Asymptotic Results ---")
+    yield flush_line(f"Smallest Root: {shifted_roots[0]:.15g}")
+    yield flush_line(f"Largest Root: {shifted_roots[-1]:.15g}")
+    for line in artifacts.finish():
+        yield flush_line(line)
+    yield from artifacts.ready()
+    yield flush_line("Computation complete.")
+    yield flush_line("---END---")
+
 
 # ============================================================
 # Main Streaming Function
 # ============================================================
 
-def stream_s2_2(params):
+def stream_s2_2(params, output_dir=OUTPUT_DIR):
     """
     Stream the computation of Legendre polynomial roots,
     LU decomposition, and Newton-Raphson results.
+    "eig_method" picks the independent root check: "sturm" (default,
+    bisection on the Jacobi matrix) or "lu_scan" (det(C - λI) sign scan).
+    "rhs" / "rhs_batch" add right-hand sides solved with the same LU factors.
+    "weights": true adds Golub-Welsch weights to legendre_roots.csv.
+    "large_n" ("auto", true, false) switches to the O(n) asymptotic rule
+    without power-basis/companion artifacts; "auto" applies past LARGE_N_AUTO.
     """
+    artifacts = ArtifactWriters()
     try:
         n_target = int(params.get("n", 5))
+        eig_method = str(params.get("eig_method", "sturm")).lower()
+        if eig_method not in EIG_METHODS:
+            raise ValueError(f"Unknown eig_method '{eig_method}' (choose from {', '.join(EIG_METHODS)})")
+        with_weights = str(params.get("weights", "false")).lower() in ("1", "true", "yes", "on")
+        os.makedirs(output_dir, exist_ok=True)
         yield flush_line(f"Computing {n_target}-order Shifted Legendre Polynomial...")
 
+        if n_target > 0 and use_large_n_mode(params, n_target):
+            yield from stream_large_n(n_target, output_dir, artifacts)
+            return
+
         # Filenames
-        COEFFS_FILE = os.path.join(OUTPUT_DIR, "legendre_coefficients.csv")
-        COMPANION_FILE = os.path.join(OUTPUT_DIR, "companion_matrix.csv")
-        ROOTS_FILE = os.path.join(OUTPUT_DIR, "legendre_roots.csv")
-        X_SOLUTION_FILE = os.path.join(OUTPUT_DIR, "x_solution_lu.csv")
+        COEFFS_FILE = os.path.join(output_dir, "legendre_coefficients.csv")
+        COMPANION_FILE = os.path.join(output_dir, "companion_matrix.csv")
+        ROOTS_FILE = os.path.join(output_dir, "legendre_roots.csv")
+        X_SOLUTION_FILE = os.path.join(output_dir, "x_solution_lu.csv")
 
         # Step 1: Compute coefficients
         p_leg_basis = L.Legendre.basis(n_target, domain=[0, 1])
@@ -114,135 +389,94 @@ def stream_s2_2(params):
         yield flush_line(f"Coefficients computed successfully for degree {n_target}.")
 
         # Save coefficients
-        with open(COEFFS_FILE, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["power", "coefficient"])
-            for i, c in enumerate(coeffs_low_to_high):
-                writer.writerow([f"t^{i}", c])
+        powers = [f"t^{i}" for i in range(len(coeffs_low_to_high))]
+        artifacts.csv(COEFFS_FILE, header="power,coefficient", fmt=["%s", "%r"]).write_columns(powers, coeffs_low_to_high)
         yield flush_line(f"Coefficients saved to {COEFFS_FILE}")
+        yield progress(0.1, "coefficients")
 
         if n_target == 0:
             yield flush_line("n=0, skipping matrix, roots, and LU solver.")
+            for line in artifacts.finish():
+                yield flush_line(line)
+            yield from artifacts.ready()
             yield flush_line("---END---")
             return
 
         # Step 2: Companion matrix
         yield flush_line(f"Building {n_target}x{n_target} companion matrix...")
         companion_mat = P_mod.polycompanion(coeffs_low_to_high)
-        np.savetxt(COMPANION_FILE, companion_mat, delimiter=",")
+        artifacts.save(COMPANION_FILE, companion_mat, fmt="%.18e", npy=True)
         yield flush_line(f"Companion matrix saved to {COMPANION_FILE}")
+        yield progress(0.2, "companion matrix")
 
         # Step 3: Compute roots via stable eigenvalue method
         yield flush_line("Calculating roots via eigenvalue decomposition...")
-        J_n = np.zeros((n_target, n_target))
-        n_range = np.arange(1.0, n_target)
-        beta = n_range / np.sqrt(4 * n_range**2 - 1)
-        np.fill_diagonal(J_n[1:, :], beta)
-        np.fill_diagonal(J_n[:, 1:], beta)
+        d, e = legendre_jacobi(n_target)
 
         start_time = time.time()
-        roots_x = np.linalg.eigh(J_n)[0]
-        shifted_roots = (roots_x + 1.0) / 2.0
-        shifted_roots.sort()
+        if with_weights:
+            roots_x, weights_x = golub_welsch(d, e, weights=True)
+        else:
+            roots_x = golub_welsch(d, e)
+        order = np.argsort(roots_x)
+        shifted_roots = (roots_x[order] + 1.0) / 2.0
         end_time = time.time()
 
         #yield flush_line(f"Root computation done in {end_time - start_time:.6f}s")
 
-        with open(ROOTS_FILE, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["root"])
-            for r in shifted_roots:
-                writer.writerow([r])
+        if with_weights:
+            artifacts.save(ROOTS_FILE, np.column_stack((shifted_roots, weights_x[order] / 2.0)), header="root,weight")
+        else:
+            artifacts.save(ROOTS_FILE, shifted_roots, header="root")
         yield flush_line(f"Roots saved to {ROOTS_FILE}")
-
-                # Step 3B: LU-based Eigenvalue Approximation & Comparison
-        yield flush_line("\n--- Comparing with LU-based Eigenvalue Method ---")
-        try:
-            # Import helper functions (use teammate's logic inline)
-            def lu_decomposition(A):
-                A = A.copy().astype(float)
-                n = A.shape[0]
-                P = np.eye(n)
-                L = np.zeros((n, n))
-                U = A.copy()
-                for k in range(n):
-                    pivot = np.argmax(abs(U[k:, k])) + k
-                    if pivot != k:
-                        U[[k, pivot], :] = U[[pivot, k], :]
-                        P[[k, pivot], :] = P[[pivot, k], :]
-                        L[[k, pivot], :k] = L[[pivot, k], :k]
-                    L[k, k] = 1.0
-                    for i in range(k + 1, n):
-                        if abs(U[k, k]) < 1e-14:
-                            continue
-                        L[i, k] = U[i, k] / U[k, k]
-                        U[i, k:] -= L[i, k] * U[k, k:]
-                return P, L, U
-
-            def determinant_from_LU(P, L, U):
-                sign = np.linalg.det(P)
-                detU = np.prod(np.diag(U))
-                return sign * detU
-
-            def eigenvalues_via_LU(C, search_min=-2, search_max=2, steps=1500):
-                n = C.shape[0]
-                eigenvalues = []
-                prev_det = None
-                lambdas = np.linspace(search_min, search_max, steps)
-                for lam in lambdas:
-                    A = C - lam * np.eye(n)
-                    try:
-                        P, L, U = lu_decomposition(A)
-                        det_val = determinant_from_LU(P, L, U)
-                    except Exception:
-                        det_val = np.nan
-                    if prev_det is not None and not np.isnan(det_val):
-                        if np.sign(prev_det) != np.sign(det_val):
-                            idx = np.where(lambdas == lam)[0][0]
-                            prev_lam = lambdas[idx - 1]
-                            eigenvalues.append((lam + prev_lam) / 2)
-                    prev_det = det_val
-                return np.array(eigenvalues)
-
-            def newton_refine(poly_coeffs, x0, tol=1e-10, max_iter=50):
-                p = np.poly1d(poly_coeffs)
-                dp = np.polyder(p)
-                x = x0
-                for _ in range(max_iter):
-                    fx = p(x)
-                    dfx = dp(x)
-                    if abs(dfx) < 1e-14:
-                        break
-                    x_new = x - fx / dfx
-                    if abs(x_new - x) < tol:
-                        return x_new
-                    x = x_new
-                return x
-
-            # Step 1: Approximation via LU determinant scanning
-            yield flush_line("Finding approximate eigenvalues using LU determinant sign changes...")
-            approx_eigs = eigenvalues_via_LU(companion_mat, -2, 2, steps=2000)
-            yield flush_line(f"Approximate eigenvalues found ({len(approx_eigs)}): {approx_eigs}")
-
-            # Step 2: Refinement
-            yield flush_line("Refining eigenvalues using Newton–Raphson...")
-            coeffs = np.poly(companion_mat)
-            refined = [newton_refine(coeffs, ev) for ev in approx_eigs]
-            refined = np.sort(np.array(refined))
-
-            # Save to output file
-            LU_ROOTS_FILE = os.path.join(OUTPUT_DIR, "legendre_roots_LU.csv")
-            np.savetxt(LU_ROOTS_FILE, refined, delimiter=",")
-            yield flush_line(f"Refined LU-based roots saved to {LU_ROOTS_FILE}")
-
-            # Step 3: Compare
-            yield flush_line("\n--- Comparison with np.linalg.eigh roots ---")
-            for i, (exact, approx) in enumerate(zip(shifted_roots, refined)):
-                yield flush_line(f"Root {i+1}: Exact={exact:.6f},  LU-Based={approx:.6f}")
-            yield flush_line("LU-based computation successful up to n ≈ 20.")
-        except Exception as e:
-            yield flush_line(f"LU-based eigenvalue section skipped due to error: {e}")
-
+        yield progress(0.4, "roots")
+
+        # Step 3B: Independent eigenvalue method & comparison
+        if eig_method == "sturm":
+            yield flush_line("\n--- Comparing with Sturm-sequence Bisection ---")
+            d, e = yield from build_legendre_tridiagonal(n_target)
+            start_time = time.time()
+            sturm_x, steps = sturm_bisection(d, e)
+            sturm_roots = (sturm_x + 1.0) / 2.0
+            yield flush_line(f"All {n_target} roots bracketed in {steps} bisection steps ({time.time() - start_time:.4f}s)")
+
+            STURM_ROOTS_FILE = os.path.join(output_dir, "legendre_roots_sturm.csv")
+            artifacts.save(STURM_ROOTS_FILE, sturm_roots, fmt="%.18e")
+            yield flush_line(f"Sturm-bisection roots saved to {STURM_ROOTS_FILE}")
+
+            yield flush_line("\n--- Comparison with tridiagonal eigensolver roots ---")
+            for i, (exact, approx) in enumerate(zip(shifted_roots, sturm_roots)):
+                yield flush_line(f"Root {i+1}: Exact={exact:.6f},  Sturm={approx:.6f}")
+        else:
+            yield flush_line("\n--- Comparing with LU-based Eigenvalue Method ---")
+            try:
+                # Step 1: Approximation via LU determinant scanning
+                yield flush_line("Finding approximate eigenvalues using LU determinant sign changes...")
+                start_time = time.time()
+                approx_eigs, samples = eigenvalues_via_det_scan(companion_mat, -2, 2)
+                yield flush_line(f"Evaluated det(C - λI) at {samples} shifts in {time.time() - start_time:.4f}s")
+                yield flush_line(f"Approximate eigenvalues found ({len(approx_eigs)}): {approx_eigs}")
+
+                # Step 2: Refinement
+                yield flush_line("Refining eigenvalues using Newton–Raphson...")
+                refined_x, iterations, _ = newton_legendre_roots(n_target, 2 * approx_eigs - 1)
+                refined = np.sort((refined_x + 1.0) / 2.0)
+
+                # Save to output file
+                LU_ROOTS_FILE = os.path.join(output_dir, "legendre_roots_LU.csv")
+                artifacts.save(LU_ROOTS_FILE, refined, fmt="%.18e")
+                yield flush_line(f"Refined LU-based roots saved to {LU_ROOTS_FILE}")
+
+                # Step 3: Compare
+                yield flush_line("\n--- Comparison with tridiagonal eigensolver roots ---")
+                for i, (exact, approx) in enumerate(zip(shifted_roots, refined)):
+                    yield flush_line(f"Root {i+1}: Exact={exact:.6f},  LU-Based={approx:.6f}")
+                yield flush_line("LU-based computation successful up to n ≈ 20.")
+            except Exception as e:
+                yield flush_line(f"LU-based eigenvalue section skipped due to error: {e}")
+
+
+        yield progress(0.6, eig_method)
 
         # Step 4: LU Solver
         yield flush_line("\n--- Solving Ax=b using LU decomposition ---")
@@ -250,37 +484,60 @@ def stream_s2_2(params):
         n = A.shape[0]
         b = np.arange(1, n + 1, dtype=float)
 
-        x_solution = solve_lu_fast(A, b)
+        lu = LUFactorization(A)
+        x_solution = lu.solve(b)
         residual = np.linalg.norm(A @ x_solution - b)
-        np.savetxt(X_SOLUTION_FILE, x_solution, delimiter=",")
+        artifacts.save(X_SOLUTION_FILE, x_solution, fmt="%.18e")
         yield flush_line(f"Solution saved to {X_SOLUTION_FILE}")
         #yield flush_line(f"Residual ||Ax - b|| = {residual:.3e}")
 
-        # Step 5: Newton–Raphson roots
-        yield flush_line("\nStarting Newton-Raphson method for smallest and largest roots...")
-        pn_legendre_coeffs = [0.0] * n_target + [1.0]
-        pn_legendre_deriv_coeffs = L.legder(pn_legendre_coeffs)
+        B = parse_rhs(params, n)
+        if B is not None:
+            yield flush_line(f"Solving {B.shape[1]} more right-hand side(s) with the same factorization...")
+            start_time = time.time()
+            X = lu.solve(B)
+            elapsed = time.time() - start_time
+            residuals = np.linalg.norm(A @ X - B, axis=0)
+            X_BATCH_FILE = os.path.join(output_dir, "x_solutions_lu_batch.csv")
+            artifacts.save(X_BATCH_FILE, X, fmt="%.18e", npy=True)
+            yield flush_line(f"{lu.solved} right-hand sides solved from one factorization in {elapsed:.4f}s "
+                             f"(max residual {residuals.max():.3e})")
+            yield flush_line(f"Solutions (one column per right-hand side) saved to {X_BATCH_FILE}")
+
+        yield progress(0.8, "LU solve")
 
-        def f(x): return L.legval(2*x - 1, pn_legendre_coeffs)
-        def f_prime(x): return L.legval(2*x - 1, pn_legendre_deriv_coeffs) * 2
+        # Step 5: Newton–Raphson roots
+        yield flush_line(f"\nStarting Newton-Raphson method for all {n_target} roots...")
+        start_time = time.time()
+        newton_x, iterations, converged = newton_legendre_roots(n_target)
+        newton_roots = (newton_x + 1.0) / 2.0
+        yield flush_line(f"{converged.sum()}/{n_target} roots converged in {time.time() - start_time:.4f}s "
+                         f"(iterations per root: min {iterations.min()}, max {iterations.max()}, "
+                         f"mean {iterations.mean():.1f})")
 
-        smallest_root = newton_raphson(f, f_prime, 0.0)
-        largest_root = newton_raphson(f, f_prime, 1.0)
+        NEWTON_ROOTS_FILE = os.path.join(output_dir, "legendre_roots_newton.csv")
+        artifacts.csv(NEWTON_ROOTS_FILE, header="root,iterations,converged").write_columns(newton_roots, iterations, converged)
+        yield flush_line(f"Newton-Raphson roots saved to {NEWTON_ROOTS_FILE}")
 
         yield flush_line("\n--- Newton-Raphson Results ---")
-        if smallest_root is not None:
-            yield flush_line(f"Smallest Root: {smallest_root:.12f}")
+        if converged[0]:
+            yield flush_line(f"Smallest Root: {newton_roots[0]:.12f}")
         else:
             yield flush_line("Could not find smallest root.")
 
-        if largest_root is not None:
-            yield flush_line(f"Largest Root: {largest_root:.12f}")
+        if converged[-1]:
+            yield flush_line(f"Largest Root: {newton_roots[-1]:.12f}")
         else:
             yield flush_line("Could not find largest root.")
 
+        for line in artifacts.finish():
+            yield flush_line(line)
+        yield from artifacts.ready()
         yield flush_line("Computation complete.")
         yield flush_line("---END---")
 
     except Exception as e:
         yield flush_line(f"Error occurred: {str(e)}")
-        yield flush_line("---END---")
\ No newline at end of file
+        yield flush_line("---END---")
+    finally:
+        artifacts.abort()
\ No newline at end of file
@@ -2,9 +2,11 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from numpy.polynomial.legendre import leggauss
-import sys
 import os
+from app.solutions.collocation import diff_matrices
+from app.solutions.gauss_legendre import cached_gauss_legendre
+from app.solutions.artifacts import ArtifactWriters
+from app.solutions.events import progress, artifact
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output", "3_1")
@@ -15,74 +17,18 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ============================================================
 
 def flush_line(line: str):
-    """Force immediate flush of a line."""
-    sys.stdout.flush()
+    """Terminate a line for streaming (make_stream_response batches the writes)."""
     return f"{line.rstrip()}\n"
 
-def find_A(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i][j] = x[i] ** j
-
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(1, n + 2):
-            C[i][j] = j * (x[i] ** (j - 1))
-    
-    A = C @ np.linalg.inv(Q)
-    return A
-
-
-def find_B(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i][j] = x[i] ** j
-
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(2, n + 2):
-            C[i][j] = j * (j - 1) * (x[i] ** (j - 2))
-    
-    B = C @ np.linalg.inv(Q)
-    return B
-
-
-def bary_weights(x):
-    n = len(x)
-    w = np.ones(n)
-    for j in range(n):
-        diff = x[j] - np.delete(x, j)
-        w[j] = 1.0 / np.prod(diff)
-    return w
-
-
-def diff_matrix(x):
-    n = len(x)
-    w = bary_weights(x)
-    D = np.zeros((n, n))
-    for i in range(n):
-        xi = x[i]
-        for j in range(n):
-            if i != j:
-                D[i, j] = w[j] / (w[i] * (xi - x[j]))
-    D[np.arange(n), np.arange(n)] = -np.sum(D, axis=1)
-    return D
-
-
 def roots_weights(n):
-    xi, wi = leggauss(n)
-    x = 0.5 * (xi + 1)
-    w = 0.5 * wi
-    return x, w
+    return cached_gauss_legendre(n, (0.0, 1.0))
 
 
 # ============================================================
 # Streaming solver
 # ============================================================
 
-def stream_s3_1(params):
+def stream_s3_1(params, output_dir=OUTPUT_DIR):
     """
     Streams Gauss-Legendre roots, weights, and A/B matrix computation.
     Example input:
@@ -91,10 +37,10 @@ def stream_s3_1(params):
         "n_matrices": 6
     }
     """
+    artifacts = ArtifactWriters()
     try:
         n_roots = int(params.get("n_roots", 6))
         n_matrices = int(params.get("n_matrices", 6))
-        output_dir = OUTPUT_DIR
         os.makedirs(output_dir, exist_ok=True)
 
         # ------------------------
@@ -105,6 +51,7 @@ def stream_s3_1(params):
 
         for i in range(n_roots):
             yield f"x[{i}] = {x[i]:.8f}, w[{i}] = {w[i]:.8f}\n"
+        yield progress(0.3, "roots")
 
         # Generate and save the plot
         plt.figure(figsize=(7, 5))
@@ -118,6 +65,8 @@ def stream_s3_1(params):
         plt.savefig(plot_file, bbox_inches="tight")
         plt.close()
         yield f"Plot saved to {plot_file}\n"
+        yield artifact(plot_file)
+        yield progress(0.5, "plot")
 
         # ------------------------
         # STEP 2: Compute A and B matrices
@@ -128,28 +77,27 @@ def stream_s3_1(params):
         x_full = np.concatenate(([0.0], x_i, [1.0]))
         w_full = np.concatenate(([0.0], w_i, [0.0]))
 
-        if n_matrices < 20:
-            A = find_A(n_matrices, x_full)
-            B = find_B(n_matrices, x_full)
-        else:
-            D = diff_matrix(x_full)
-            D2 = D @ D
-            A = D
-            B = D2
+        A, B = diff_matrices(x_full)
 
         # Save A matrix
         A_file = os.path.join(output_dir, "A_matrix.csv")
-        np.savetxt(A_file, A, delimiter=",", fmt="%.6f", comments="", header="A-matrix")
+        artifacts.save(A_file, A, fmt="%.6f", header="A-matrix", npy=True)
         yield f"Saved A matrix to {A_file}\n"
+        yield progress(0.75, "A matrix")
 
         # Save B matrix
         B_file = os.path.join(output_dir, "B_matrix.csv")
-        np.savetxt(B_file, B, delimiter=",", fmt="%.6f", comments="", header="B-matrix")
+        artifacts.save(B_file, B, fmt="%.6f", header="B-matrix", npy=True)
         yield f"Saved B matrix to {B_file}\n"
 
+        for line in artifacts.finish():
+            yield f"{line}\n"
+        yield from artifacts.ready()
         yield "\nAll computations completed successfully.\n"
         yield "---END---"
 
     except Exception as e:
         yield f"Error: {str(e)}\n"
-        yield "---END---"
\ No newline at end of file
+        yield "---END---"
+    finally:
+        artifacts.abort()
\ No newline at end of file
@@ -2,10 +2,11 @@
 import numpy as np
 import math
 import matplotlib.pyplot as plt
-from numpy.polynomial.legendre import leggauss
 from scipy.special import erf
-import sys
 import os
+from app.solutions.collocation import gl_roots_with_endpoints, bary_weights, bary_interp, diff_matrices, solve_collocation
+from app.solutions.artifacts import ArtifactWriters
+from app.solutions.events import progress
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output", "3_2")
@@ -16,78 +17,43 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ============================================================
 
 def flush_line(line: str):
-    """Force immediate flush of a line for true real-time streaming."""
-    sys.stdout.flush()
+    """Terminate a line for streaming (make_stream_response batches the writes)."""
     return f"{line.rstrip()}\n"
 
-def find_A(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i][j] = x[i] ** j
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(1, n + 2):
-            C[i][j] = j * (x[i] ** (j - 1))
-    return np.matmul(C, np.linalg.inv(Q))
-
-def find_B(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i][j] = x[i] ** j
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(2, n + 2):
-            C[i][j] = j * (j - 1) * (x[i] ** (j - 2))
-    return np.matmul(C, np.linalg.inv(Q))
-
-def bary_weights(x):
-    n = len(x)
-    w = np.ones(n)
-    for j in range(n):
-        diff = x[j] - np.delete(x, j)
-        w[j] = 1.0 / np.prod(diff)
-    return w
-
-def diff_matrix(x):
-    n = len(x)
-    w = bary_weights(x)
-    D = np.zeros((n, n))
-    for i in range(n):
-        xi = x[i]
-        for j in range(n):
-            if i != j:
-                D[i, j] = w[j] / (w[i] * (xi - x[j]))
-    D[np.arange(n), np.arange(n)] = -np.sum(D, axis=1)
-    return D
-
-def gl_roots_with_endpoints(n):
-    xi, _ = leggauss(n)
-    return np.concatenate(([0.0], 0.5 * (xi + 1.0), [1.0]))
-
-def coeff_2nd_diff(x): return x
-def coeff_1st_diff(x): return (1 + 2 * math.log(max(x, 1e-12)))
 smallest_num = math.ulp(0.0)
 
+def error_matrix_rows(x, w, y, X_rows, tau_vals, To, Ts, alpha):
+    """
+    Broadcast T_analytical - T_X_tau over an (X rows) x (tau) block.
+    f(eta) is evaluated by barycentric interpolation of the nodal values
+    on the whole exp(-eta) array.
+    """
+    scale = 2 * np.sqrt(np.maximum(alpha * tau_vals, smallest_num))
+    eta = X_rows[:, None] / scale[None, :]
+    T_ana = To + (Ts - To) * erf(eta)
+    T_col = To + (Ts - To) * bary_interp(x, w, y, np.exp(-eta))
+    return T_ana - T_col
+
 
 # ------------------------------------------------------
 # Main streamed computation
 # ------------------------------------------------------
 
-def stream_s3_2(params):
+def stream_s3_2(params, output_dir=OUTPUT_DIR):
     """
     Stream solution of the PDE using collocation and compare
     numerical vs analytical temperature profiles.
     Saves results to /output/ folder.
+    Optional params: "num_X" and "num_tau" set the error-matrix grid
+    (default 101 x 101), "chunk_rows" sets rows per progress line.
     """
+    artifacts = ArtifactWriters()
     try:
         n = int(params.get("n", 6))
         To = float(params.get("To", 273))
         Ts = float(params.get("Ts", 373))
         alpha = float(params.get("alpha", 1e-5))
         L = float(params.get("L", 5))
-        output_dir = OUTPUT_DIR
         os.makedirs(output_dir, exist_ok=True)
 
         yield flush_line(f"Starting collocation-based PDE solver for n = {n}...")
@@ -96,85 +62,46 @@ def stream_s3_2(params):
         # Build collocation matrices
         # ------------------------------------------------------
         x = gl_roots_with_endpoints(n)
-        y = np.zeros(n + 2)
-
-        if n < 20:
-            A = find_A(n, x)
-            B = find_B(n, x)
-        else:
-            D = diff_matrix(x)
-            A = D
-            B = D @ D
+        w = bary_weights(x)
+        A, B = diff_matrices(x, w)
 
         yield flush_line("Solving collocation system...")
-
-        y[0] = 1
-        y[n + 1] = 0
-        coeffs = np.zeros((n + 2, n + 2))
-        for i in range(1, n + 1):
-            for j in range(n + 2):
-                coeffs[i][j] = coeff_2nd_diff(x[i]) * B[i][j] + coeff_1st_diff(x[i]) * A[i][j]
-
-        C = np.zeros((n, n))
-        D = np.zeros(n)
-        for i in range(n):
-            for j in range(n):
-                C[i][j] = coeffs[i + 1][j + 1]
-            D[i] = - (y[0] * coeffs[i + 1][0] + y[n + 1] * coeffs[i + 1][n + 1])
-
-        y_inner = np.linalg.solve(C, D)
-        for i in range(n):
-            y[i + 1] = y_inner[i]
-
+        y = solve_collocation(x, A, B)
         yield flush_line("Collocation system solved successfully.")
-
-        # ------------------------------------------------------
-        # Polynomial coefficients
-        # ------------------------------------------------------
-        yield flush_line("Computing polynomial coefficients...")
-        Q = np.zeros((n + 2, n + 2))
-        for i in range(n + 2):
-            for j in range(n + 2):
-                Q[i][j] = x[i] ** j
-        d = np.linalg.solve(Q, y)
-
-        def f_eta(eta):
-            z = math.exp(-eta)
-            return sum((z ** i) * d[i] for i in range(n + 2))
-
-        def T_X_tau(X, tau):
-            smallest_num = math.ulp(0.0)
-            eta = X / (2 * np.sqrt(max(alpha * tau, smallest_num)))
-            return To + (Ts - To) * f_eta(eta)
-
-        def T_analytical(X, tau):
-            smallest_num = math.ulp(0.0)
-            return To + (Ts - To) * erf(X / (2 * np.sqrt(max(alpha * tau, smallest_num))))
+        yield progress(0.05, "collocation")
 
         # ------------------------------------------------------
         # Error matrix computation
         # ------------------------------------------------------
-        
-        yield flush_line("Computing temperature error matrix over x and Tau range...")
-        num_X = 101
-        num_tau = 101
+        num_X = int(params.get("num_X", 101))
+        num_tau = int(params.get("num_tau", 101))
+        chunk_rows = max(1, int(params.get("chunk_rows", 20)))
+
+        yield flush_line(f"Computing {num_X}x{num_tau} temperature error matrix over x and Tau range...")
         X_vals_err = np.linspace(smallest_num, L + smallest_num, num_X)
         tau_vals_err = np.linspace(smallest_num, 10000 + smallest_num, num_tau)
-        error_matrix = np.zeros((num_X, num_tau))
-
-        for i, Xv in enumerate(X_vals_err):
-            for j, tau in enumerate(tau_vals_err):
-                T_ana = T_analytical(Xv, tau)
-                T_col = T_X_tau(Xv, tau)
-                error_matrix[i, j] = T_ana - T_col
-            if i % 20 == 0:
-                yield flush_line(f"  • Progress: {i}/{num_X} spatial points done")
+        error_matrix = np.empty((num_X, num_tau))
 
+        # Rows are handed to the writer thread as soon as each chunk is done
         header_row = "X/Tau," + ",".join([f"{tau:.6e}" for tau in tau_vals_err])
-        data_with_X = np.column_stack((X_vals_err, error_matrix))
         csv_filename = os.path.join(output_dir, f"temperature_error_matrix.csv")
-        np.savetxt(csv_filename, data_with_X, delimiter=",", header=header_row, comments="", fmt="%.6e")
-
+        error_csv = artifacts.csv(csv_filename, header=header_row, fmt="%.6e")
+
+        for i in range(0, num_X, chunk_rows):
+            rows = slice(i, min(i + chunk_rows, num_X))
+            error_matrix[rows] = error_matrix_rows(x, w, y, X_vals_err[rows], tau_vals_err, To, Ts, alpha)
+            error_csv.write(np.column_stack((X_vals_err[rows], error_matrix[rows])))
+            yield flush_line(f"  • Progress: {rows.stop}/{num_X} spatial points done")
+            yield progress(0.05 + 0.9 * rows.stop / num_X, "error matrix")
+
+        # Binary copies: rows match the CSV body (X, errors...), tau is the header axis
+        artifacts.save_npy(os.path.join(output_dir, "temperature_error_matrix.npy"),
+                           np.column_stack((X_vals_err, error_matrix)))
+        artifacts.save_npy(os.path.join(output_dir, "temperature_error_tau.npy"), tau_vals_err)
+
+        for line in artifacts.finish():
+            yield flush_line(line)
+        yield from artifacts.ready()
         yield flush_line(f"Saved temperature error matrix to {csv_filename}")
         yield flush_line(f"Computation completed (n = {n}, L = {L}, alpha = {alpha})")
         yield flush_line("---END---")
@@ -182,3 +109,5 @@ def stream_s3_2(params):
     except Exception as e:
         yield flush_line(f"Error occurred: {str(e)}")
         yield flush_line("---END---")
+    finally:
+        artifacts.abort()
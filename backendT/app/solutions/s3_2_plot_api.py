@@ -1,63 +1,101 @@
 import numpy as np
 import math
+import os
+import threading
+from collections import OrderedDict
 from scipy.special import erf
-from numpy.polynomial.legendre import leggauss
 from fastapi import APIRouter
+from app.solutions.collocation import gl_roots_with_endpoints, bary_weights, bary_interp, diff_matrices, solve_collocation
 
 router = APIRouter()
 
 # ============================================================
-# Helper functions
+# Collocation state cache
 # ============================================================
-
-def find_A(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i, j] = x[i] ** j
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(1, n + 2):
-            C[i, j] = j * (x[i] ** (j - 1))
-    return C @ np.linalg.inv(Q)
-
-def find_B(n, x):
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i, j] = x[i] ** j
-    C = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(2, n + 2):
-            C[i, j] = j * (j - 1) * (x[i] ** (j - 2))
-    return C @ np.linalg.inv(Q)
-
-def bary_weights(x):
-    n = len(x)
-    w = np.ones(n)
-    for j in range(n):
-        diff = x[j] - np.delete(x, j)
-        w[j] = 1.0 / np.prod(diff)
-    return w
-
-def diff_matrix(x):
-    n = len(x)
+# Nothing in the collocation solve depends on tau, so a slider drag
+# only needs the cheap T(X, tau) evaluation once the state is cached.
+
+COLLOCATION_CACHE_SIZE = int(os.environ.get("COLLOCATION_CACHE_SIZE", "128"))
+
+
+class CollocationCache:
+    """Thread-safe LRU cache of solved collocation states with hit/miss counters."""
+
+    def __init__(self, maxsize=COLLOCATION_CACHE_SIZE):
+        self.maxsize = max(1, int(maxsize))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so one slow solve doesn't block other keys
+        state = build()
+
+        with self._lock:
+            self._entries[key] = state
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return state
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+collocation_cache = CollocationCache()
+
+
+def build_collocation_state(n, To, Ts, alpha, L):
+    """Solve the collocation system once and return everything tau-independent."""
+    x = gl_roots_with_endpoints(n)
     w = bary_weights(x)
-    D = np.zeros((n, n))
-    for i in range(n):
-        xi = x[i]
-        for j in range(n):
-            if i != j:
-                D[i, j] = w[j] / (w[i] * (xi - x[j]))
-    D[np.arange(n), np.arange(n)] = -np.sum(D, axis=1)
-    return D
+    A, B = diff_matrices(x, w)
+    y = solve_collocation(x, A, B)
+
+    X_vals = np.linspace(0, L, 200)
+    return {"n": n, "To": To, "Ts": Ts, "alpha": alpha, "L": L, "x": x, "w": w, "y": y, "X": X_vals}
+
+
+def get_collocation_state(n, To, Ts, alpha, L):
+    key = (n, To, Ts, alpha, L)
+    return collocation_cache.get_or_build(key, lambda: build_collocation_state(n, To, Ts, alpha, L))
 
-def gl_roots_with_endpoints(n):
-    xi, _ = leggauss(n)
-    return np.concatenate(([0.0], 0.5 * (xi + 1.0), [1.0]))
 
-def coeff_2nd_diff(x): return x
-def coeff_1st_diff(x): return (1 + 2 * math.log(max(x, 1e-12)))
+def evaluate_temperature(state, tau):
+    """Evaluate collocation and analytical T(X, tau) over the cached X grid."""
+    To, Ts, alpha = state["To"], state["Ts"], state["alpha"]
+    X_vals = state["X"]
+    smallest_num = math.ulp(0.0)
+    eta = X_vals / (2 * np.sqrt(max(alpha * tau, smallest_num)))
+
+    z = np.exp(-np.clip(eta, 0, 50))  # avoids overflow in exp(-eta)
+    T_coll = To + (Ts - To) * bary_interp(state["x"], state["w"], state["y"], z)
+    T_anal = To + (Ts - To) * erf(eta)
+    return T_coll, T_anal
 
 
 # ============================================================
@@ -86,72 +124,22 @@ async def compute_temperature(params: dict):
     L = float(params.get("L", 5))
 
     # --------------------------------------------------------
-    # Collocation setup
+    # Collocation setup (cached, independent of tau)
     # --------------------------------------------------------
-    x = gl_roots_with_endpoints(n)
-    y = np.zeros(n + 2)
-
-    if n < 20:
-        A = find_A(n, x)
-        B = find_B(n, x)
-    else:
-        D = diff_matrix(x)
-        A = D
-        B = D @ D
-
-    y[0] = 1
-    y[n + 1] = 0
-    coeffs = np.zeros((n + 2, n + 2))
-    for i in range(1, n + 1):
-        for j in range(n + 2):
-            coeffs[i, j] = coeff_2nd_diff(x[i]) * B[i, j] + coeff_1st_diff(x[i]) * A[i, j]
-
-    C = np.zeros((n, n))
-    Dv = np.zeros(n)
-    for i in range(n):
-        for j in range(n):
-            C[i, j] = coeffs[i + 1, j + 1]
-        Dv[i] = - (y[0] * coeffs[i + 1, 0] + y[n + 1] * coeffs[i + 1, n + 1])
-
-    y_inner = np.linalg.solve(C, Dv)
-    for i in range(n):
-        y[i + 1] = y_inner[i]
-
-    # Polynomial coefficients
-    Q = np.zeros((n + 2, n + 2))
-    for i in range(n + 2):
-        for j in range(n + 2):
-            Q[i, j] = x[i] ** j
-    d = np.linalg.solve(Q, y)
-
-    def f_eta(eta):
-        eta = np.clip(eta, 0, 50)  # avoids overflow in exp(-eta)
-        z = np.exp(-eta)
-        return sum((z ** i) * d[i] for i in range(n + 2))
-
-    def T_X_tau(X, tau):
-        smallest_num = math.ulp(0.0)
-        eta = X / (2 * np.sqrt(max(alpha * tau, smallest_num)))
-        return To + (Ts - To) * f_eta(eta)
-
-    def T_analytical(X, tau):
-        smallest_num = math.ulp(0.0)
-        return To + (Ts - To) * erf(X / (2 * np.sqrt(max(alpha * tau, smallest_num))))
+    state = get_collocation_state(n, To, Ts, alpha, L)
 
     # --------------------------------------------------------
     # Compute over range
     # --------------------------------------------------------
-    X_vals = np.linspace(0, L, 200)
-    T_coll = [T_X_tau(X, tau) for X in X_vals]
-    T_anal = [T_analytical(X, tau) for X in X_vals]
+    T_coll, T_anal = evaluate_temperature(state, tau)
 
     # --------------------------------------------------------
     # Return data
     # --------------------------------------------------------
     return {
-        "X": X_vals.tolist(),
-        "T_coll": T_coll,
-        "T_anal": T_anal,
+        "X": state["X"].tolist(),
+        "T_coll": T_coll.tolist(),
+        "T_anal": T_anal.tolist(),
         "tau": tau,
         "n": n,
         "To": To,
@@ -159,3 +147,9 @@ async def compute_temperature(params: dict):
         "alpha": alpha,
         "L": L
     }
+
+
+@router.get("/compute_temp/cache")
+async def compute_temperature_cache_stats():
+    """Report hit/miss counters of the collocation state cache."""
+    return collocation_cache.stats()
@@ -0,0 +1,137 @@
+# app/workspace.py
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+# ===============================================================
+# Per-run output workspaces
+# ===============================================================
+# Every streamed run writes into output/<question_id>/<run_id>/ so that
+# concurrent users never clobber each other's files. A janitor evicts
+# finished runs by age and by total disk budget.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # project root (one level above app/)
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")  # project_root/output
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+RUN_MAX_AGE_SECONDS = float(os.environ.get("RUN_MAX_AGE_SECONDS", "3600"))
+RUN_DISK_BUDGET_BYTES = int(os.environ.get("RUN_DISK_BUDGET_BYTES", str(512 * 1024 * 1024)))
+JANITOR_INTERVAL_SECONDS = float(os.environ.get("JANITOR_INTERVAL_SECONDS", "60"))
+
+RUN_ID_PATTERN = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+
+_active_runs = set()
+_active_lock = threading.Lock()
+
+
+def is_valid_run_id(run_id: str) -> bool:
+    return bool(RUN_ID_PATTERN.match(run_id or ""))
+
+
+def get_question_dir(question_id: str) -> str:
+    """Return (and ensure) a subfolder for a given question inside output/."""
+    folder = os.path.join(OUTPUT_DIR, question_id)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+def create_run(question_id: str):
+    """Create a fresh run workspace and mark it active. Returns (run_id, folder)."""
+    run_id = new_run_id()
+    folder = os.path.join(get_question_dir(question_id), run_id)
+    os.makedirs(folder)
+    with _active_lock:
+        _active_runs.add(folder)
+    return run_id, folder
+
+
+def release_run(folder: str):
+    """Mark a run as finished so the janitor may evict it."""
+    with _active_lock:
+        _active_runs.discard(folder)
+
+
+def list_runs(question_id: str):
+    """Run IDs of a question, oldest first."""
+    folder = os.path.join(OUTPUT_DIR, question_id)
+    if not os.path.isdir(folder):
+        return []
+    runs = [r for r in os.listdir(folder) if is_valid_run_id(r) and os.path.isdir(os.path.join(folder, r))]
+    runs.sort()
+    return runs
+
+
+def resolve_run_dir(question_id: str, run_id: str = None):
+    """
+    Return (folder, run_id) for listing a question's files.
+    Without a run_id the latest run is used, falling back to files kept
+    directly in output/<question_id>/ (run_id None) when there are no runs.
+    """
+    if run_id is None:
+        runs = list_runs(question_id)
+        if not runs:
+            return os.path.join(OUTPUT_DIR, question_id), None
+        run_id = runs[-1]
+    if not is_valid_run_id(run_id):
+        raise ValueError(f"Invalid run id: {run_id}")
+    return os.path.join(OUTPUT_DIR, question_id, run_id), run_id
+
+
+def link_file(src: str, dst: str):
+    """Hard-link a finished artifact into another folder (copy across filesystems)."""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _dir_size(folder: str) -> int:
+    total = 0
+    for root, _, files in os.walk(folder):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def evict_runs(max_age=RUN_MAX_AGE_SECONDS, disk_budget=RUN_DISK_BUDGET_BYTES):
+    """
+    Delete finished runs older than max_age, then the oldest remaining ones
+    until the total size fits disk_budget. Returns the evicted run folders.
+    """
+    now = time.time()
+    with _active_lock:
+        active = set(_active_runs)
+
+    runs = []
+    for question_id in os.listdir(OUTPUT_DIR):
+        for run_id in list_runs(question_id):
+            folder = os.path.join(OUTPUT_DIR, question_id, run_id)
+            try:
+                mtime = os.path.getmtime(folder)
+            except OSError:
+                continue
+            runs.append((mtime, folder, _dir_size(folder)))
+    runs.sort()
+
+    evicted = []
+    total = sum(size for _, _, size in runs)
+    for mtime, folder, size in runs:
+        if folder in active:
+            continue
+        if now - mtime > max_age or total > disk_budget:
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
+            evicted.append(folder)
+    return evicted
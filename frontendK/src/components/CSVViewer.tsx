@@ -4,30 +4,56 @@ interface CSVViewerProps {
   fileUrl: string;
 }
 
+const PAGE_ROWS = 1000;
+
 const CSVViewer: React.FC<CSVViewerProps> = ({ fileUrl }) => {
   const [rows, setRows] = useState<string[][]>([]);
   const [error, setError] = useState<string | null>(null);
+  const [nextOffset, setNextOffset] = useState<number | null>(0);
+  const [totalRows, setTotalRows] = useState<number | null>(null);
+  const [loading, setLoading] = useState(false);
+
+  // /fullcsv is paginated: fetch PAGE_ROWS rows at a time as the table scrolls
+  const fetchPage = async (offset: number, reset = false) => {
+    setLoading(true);
+    try {
+      const res = await fetch(`http://127.0.0.1:8000/fullcsv/${fileUrl}?offset=${offset}&limit=${PAGE_ROWS}`);
+      if (!res.ok) throw new Error(`Failed: ${res.statusText}`);
+      const json = await res.json();
+      if (!json.rows) throw new Error("No data found in CSV");
+      setRows((prev) => (reset ? json.rows : [...prev, ...json.rows]));
+      setNextOffset(json.next_offset ?? null);
+      setTotalRows(json.total_rows ?? null);
+      if (reset && !json.rows.length) setError("No data found in CSV");
+    } catch (err) {
+      setError("Failed to load CSV");
+    } finally {
+      setLoading(false);
+    }
+  };
 
   useEffect(() => {
-    const fetchCSV = async () => {
-      try {
-        const res = await fetch(`http://127.0.0.1:8000/fullcsv/${fileUrl}`);
-        if (!res.ok) throw new Error(`Failed: ${res.statusText}`);
-        const json = await res.json();
-        if (json.rows) setRows(json.rows);
-        else setError("No data found in CSV");
-      } catch (err) {
-        setError("Failed to load CSV");
-      }
-    };
-    fetchCSV();
+    setRows([]);
+    setError(null);
+    setNextOffset(0);
+    fetchPage(0, true);
   }, [fileUrl]);
 
+  const handleScroll = (e: React.UIEvent<HTMLDivElement>) => {
+    const el = e.currentTarget;
+    if (!loading && nextOffset !== null && el.scrollTop + el.clientHeight >= el.scrollHeight - 200) {
+      fetchPage(nextOffset);
+    }
+  };
+
   if (error) return <p className="text-red-400">{error}</p>;
   if (!rows.length) return <p>Loading CSV...</p>;
 
   return (
-    <div className="max-h-[70vh] overflow-auto border border-gray-700 rounded-lg bg-gray-900 p-2">
+    <div
+      className="max-h-[70vh] overflow-auto border border-gray-700 rounded-lg bg-gray-900 p-2"
+      onScroll={handleScroll}
+    >
       <table className="text-sm text-gray-200 w-full border-collapse">
         <tbody>
           {rows.map((row, i) => (
@@ -44,6 +70,11 @@ const CSVViewer: React.FC<CSVViewerProps> = ({ fileUrl }) => {
           ))}
         </tbody>
       </table>
+      {totalRows !== null && rows.length < totalRows && (
+        <p className="text-xs text-gray-400 p-1">
+          Showing {rows.length} of {totalRows} rows{loading ? " — loading more..." : ""}
+        </p>
+      )}
     </div>
   );
 };
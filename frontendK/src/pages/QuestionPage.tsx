@@ -941,6 +941,7 @@ plt.show()`
       const decoder = new TextDecoder("utf-8");
 
       let buffer = "";
+      let runId: string | null = null;
       setTerminalLines((prev) => [
         ...prev,
         { text: `Connected to ${url}`, type: "success" },
@@ -957,6 +958,8 @@ plt.show()`
 
         for (const line of lines) {
           if (!line.trim()) continue;
+          const runMatch = line.match(/^Run ID: (\S+)/);
+          if (runMatch) runId = runMatch[1];
           if (line.includes("---END---")) {
             setTerminalLines((prev) => [
               ...prev,
@@ -965,7 +968,8 @@ plt.show()`
             setIsComputing(false);
 
             try {
-              const res = await fetch(`http://127.0.0.1:8000/files/${endpoint}`);
+              const query = runId ? `?run_id=${encodeURIComponent(runId)}` : "";
+              const res = await fetch(`http://127.0.0.1:8000/files/${endpoint}${query}`);
               const data = await res.json();
               setAvailableFiles(data.available_files || []);
             } catch (err) {